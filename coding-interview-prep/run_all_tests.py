@@ -11,6 +11,7 @@ def main():
 
     loader = unittest.TestLoader()
     suite = loader.discover('.', pattern='test_exercise.py')
+    suite.addTests(loader.discover('solutions', pattern='test_*_solution.py', top_level_dir='solutions'))
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
     sys.exit(0 if result.wasSuccessful() else 1)
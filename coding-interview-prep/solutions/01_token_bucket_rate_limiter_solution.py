@@ -3,8 +3,27 @@ Token Bucket Rate Limiter - Solution
 
 A rate limiter that uses the token bucket algorithm. Tokens are added at a
 constant refill rate up to a maximum capacity. Each request consumes one token.
+
+AsyncTokenBucketRateLimiter extends the bucket for asyncio clients: callers
+await acquire() and are woken in FIFO order at the exact moment enough tokens
+have refilled, instead of polling allow_request() in a sleep loop.
+
+HierarchicalRateLimiter enforces nested limits (global -> tenant -> client)
+where a request must draw from every level at once. QuotaCoordinator and
+LeasedTokenBucket share one global rate across worker processes: workers
+lease blocks of tokens over an authenticated local socket and spend them
+without a round-trip per request; unspent leases count against the global
+capacity and expire after a TTL.
 """
 
+import asyncio
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Sequence
+
 
 class TokenBucketRateLimiter:
     def __init__(self, capacity: int, refill_rate: float):
@@ -55,3 +74,432 @@ class TokenBucketRateLimiter:
             The current token count as a float.
         """
         return self.tokens
+
+
+class AsyncTokenBucketRateLimiter(TokenBucketRateLimiter):
+    """Token bucket whose callers can wait for tokens instead of being rejected.
+
+    Waiters are served strictly first-come, first-served: a large request at
+    the head of the queue is not starved by smaller requests arriving later.
+    A single timer is armed for the instant the head waiter can be satisfied,
+    so an idle bucket with pending waiters costs no CPU.
+
+    Time is read from the running event loop's monotonic clock, so do not mix
+    acquire() with allow_request() calls that pass a different time base.
+    """
+
+    def __init__(self, capacity: int, refill_rate: float):
+        """
+        Initialize the async token bucket.
+
+        Args:
+            capacity: Maximum number of tokens the bucket can hold.
+            refill_rate: Number of tokens added per second.
+        """
+        super().__init__(capacity, refill_rate)
+        self._waiters = deque()
+        self._wakeup = None
+
+    async def acquire(self, tokens: int = 1, timeout: float = None) -> None:
+        """
+        Wait until `tokens` tokens are available and consume them.
+
+        Args:
+            tokens: Number of tokens to consume.
+            timeout: Maximum seconds to wait, or None to wait indefinitely.
+
+        Raises:
+            ValueError: If `tokens` is less than 1 or exceeds the bucket
+                capacity.
+            asyncio.TimeoutError: If the tokens were not granted in time.
+        """
+        if tokens < 1:
+            raise ValueError(f"tokens must be at least 1, got {tokens}")
+        if tokens > self.capacity:
+            raise ValueError(
+                f"cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}"
+            )
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+
+        # Fast path: nobody is queued ahead of us and the tokens are there.
+        if not self._waiters and self.tokens >= tokens:
+            self.tokens -= tokens
+            return
+
+        future = loop.create_future()
+        self._waiters.append((tokens, future))
+        self._dispatch(loop)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Tokens were granted just as we were cancelled: give them back.
+                self.tokens = min(self.capacity, self.tokens + tokens)
+            # Our (now cancelled) entry may have been blocking the queue.
+            self._dispatch(loop)
+            raise
+
+    def pending(self) -> int:
+        """
+        Return the number of callers currently waiting for tokens.
+
+        Returns:
+            Count of waiters that have not been granted, cancelled or timed out.
+        """
+        return sum(1 for _, future in self._waiters if not future.done())
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Grant tokens to waiters in FIFO order and arm a timer for the next one.
+
+        Args:
+            loop: The event loop the waiters belong to.
+        """
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        now = loop.time()
+        self._refill(now)
+        while self._waiters:
+            tokens, future = self._waiters[0]
+            if future.done():
+                # Cancelled or timed out; drop it lazily.
+                self._waiters.popleft()
+                continue
+            if self.tokens < tokens:
+                break
+            self.tokens -= tokens
+            self._waiters.popleft()
+            future.set_result(None)
+
+        if self._waiters and self.refill_rate > 0:
+            tokens, _ = self._waiters[0]
+            delay = (tokens - self.tokens) / self.refill_rate
+            self._wakeup = loop.call_at(now + delay, self._dispatch, loop)
+
+
+class HierarchicalRateLimiter:
+    """A tree of token buckets where a request draws from every ancestor.
+
+    Buckets are addressed by paths such as ("tenant-a", "client-1"). The root
+    bucket (path ()) is the global limit. A request for a path is allowed only
+    if the bucket at that path *and* every bucket above it have enough tokens;
+    either all of them are charged or none are.
+    """
+
+    def __init__(self, capacity: int, refill_rate: float):
+        """
+        Initialize the limiter with its global (root) bucket.
+
+        Args:
+            capacity: Maximum number of tokens in the global bucket.
+            refill_rate: Number of tokens added to the global bucket per second.
+        """
+        self._buckets = {(): TokenBucketRateLimiter(capacity, refill_rate)}
+        self._lock = threading.Lock()
+
+    def add_bucket(self, path: Sequence[str], capacity: int, refill_rate: float) -> None:
+        """
+        Register a bucket below an existing one.
+
+        Args:
+            path: Path of the new bucket; its parent path must already exist.
+            capacity: Maximum number of tokens the bucket can hold.
+            refill_rate: Number of tokens added per second.
+
+        Raises:
+            KeyError: If the parent bucket has not been registered.
+            ValueError: If a bucket already exists at `path`.
+        """
+        path = tuple(path)
+        if not path:
+            raise ValueError("the root bucket is created by the constructor")
+        if path[:-1] not in self._buckets:
+            raise KeyError(f"parent bucket {path[:-1]!r} is not registered")
+        if path in self._buckets:
+            raise ValueError(f"bucket {path!r} is already registered")
+        self._buckets[path] = TokenBucketRateLimiter(capacity, refill_rate)
+
+    def allow_request(self, path: Sequence[str], current_time: float, tokens: int = 1) -> bool:
+        """
+        Atomically draw `tokens` from the bucket at `path` and all its ancestors.
+
+        Args:
+            path: Path of the most specific bucket, e.g. ("tenant-a", "client-1").
+            current_time: The current timestamp in seconds.
+            tokens: Number of tokens the request costs.
+
+        Returns:
+            True if every level had enough tokens, False otherwise (in which
+            case no level is charged).
+
+        Raises:
+            ValueError: If `tokens` is less than 1.
+        """
+        if tokens < 1:
+            raise ValueError(f"tokens must be at least 1, got {tokens}")
+        path = tuple(path)
+        chain = [self._buckets[path[:depth]] for depth in range(len(path) + 1)]
+        with self._lock:
+            for bucket in chain:
+                bucket._refill(current_time)
+            if any(bucket.tokens < tokens for bucket in chain):
+                return False
+            for bucket in chain:
+                bucket.tokens -= tokens
+            return True
+
+    def get_tokens(self, path: Sequence[str] = ()) -> float:
+        """
+        Return the current number of tokens in the bucket at `path`.
+
+        Args:
+            path: Path of the bucket; defaults to the global bucket.
+
+        Returns:
+            The token count as a float.
+        """
+        return self._buckets[tuple(path)].get_tokens()
+
+
+class QuotaCoordinator:
+    """Owns the global token bucket and leases blocks of it to workers.
+
+    Serves LeasedTokenBucket clients over a multiprocessing.connection
+    listener (a Unix socket or localhost TCP port). Each request is one
+    round-trip per leased block rather than per rate-limited call.
+
+    Leased tokens that a worker has not reported as spent still count
+    against the bucket's capacity, so the bucket plus all outstanding
+    leases never holds more than `capacity` tokens. A lease is valid for
+    `lease_ttl` seconds after its last renewal. At expiry the worker drops
+    its balance and the coordinator reclaims the headroom, so a stalled or
+    hoarding worker cannot bank tokens while the bucket refills.
+    """
+
+    def __init__(self, capacity: int, refill_rate: float, address=None, *,
+                 authkey: bytes, lease_ttl: float = 1.0):
+        """
+        Initialize the coordinator and bind its listener.
+
+        Args:
+            capacity: Maximum number of tokens in the global bucket.
+            refill_rate: Number of tokens added to the global bucket per second.
+            address: Listener address; None picks a free local address.
+            authkey: Shared secret workers must present when connecting.
+                Required: messages are unpickled, so unauthenticated peers
+                must not be able to send them.
+            lease_ttl: Seconds a lease stays valid after it was last renewed.
+
+        Raises:
+            ValueError: If `authkey` is empty or `lease_ttl` is not positive.
+        """
+        if not authkey:
+            raise ValueError("authkey is required to authenticate workers")
+        if lease_ttl <= 0:
+            raise ValueError(f"lease_ttl must be positive, got {lease_ttl}")
+        self.lease_ttl = lease_ttl
+        self._bucket = TokenBucketRateLimiter(capacity, refill_rate)
+        self._bucket.last_refill_time = time.monotonic()
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+
+    def _refill(self, now: float) -> None:
+        """
+        Refill the bucket, drop expired leases and cap the bucket at the
+        capacity not held by outstanding leases. The caller holds the lock.
+        """
+        for client, (_, expires_at) in list(self._leases.items()):
+            if expires_at <= now:
+                del self._leases[client]
+        self._bucket._refill(now)
+        outstanding = sum(held for held, _ in self._leases.values())
+        self._bucket.tokens = min(self._bucket.tokens, self._bucket.capacity - outstanding)
+
+    def lease(self, client, tokens: int, spent: int = 0) -> int:
+        """
+        Take up to `tokens` whole tokens from the global bucket for `client`
+        and renew its lease for another `lease_ttl` seconds.
+
+        Args:
+            client: Hashable identifier of the worker holding the lease.
+            tokens: Number of tokens requested.
+            spent: Leased tokens the worker has spent since its last call.
+
+        Returns:
+            Number of tokens granted (possibly 0).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            held = max(0, self._leases.get(client, (0, now))[0] - spent)
+            granted = max(0, min(tokens, int(self._bucket.tokens)))
+            self._bucket.tokens -= granted
+            self._leases[client] = (held + granted, now + self.lease_ttl)
+            return granted
+
+    def release(self, client, tokens: int, spent: int = 0) -> None:
+        """
+        Return unused leased tokens to the global bucket.
+
+        Tokens of an expired lease have already been reclaimed and are not
+        returned again.
+
+        Args:
+            client: Hashable identifier of the worker holding the lease.
+            tokens: Number of tokens being returned.
+            spent: Leased tokens the worker has spent since its last call.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if client not in self._leases:
+                return
+            held = max(0, self._leases.pop(client)[0] - spent)
+            self._bucket.tokens = min(self._bucket.capacity, self._bucket.tokens + min(tokens, held))
+
+    def serve_forever(self) -> None:
+        """
+        Accept worker connections until close() is called.
+
+        A client that fails the authkey handshake or drops the connection
+        during it is discarded, and serving continues.
+        """
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def start(self) -> threading.Thread:
+        """
+        Serve workers from a daemon thread of the current process.
+
+        Returns:
+            The serving thread.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        """Stop accepting new workers."""
+        self._listener.close()
+
+    def _handle(self, conn) -> None:
+        """
+        Answer lease/release messages from one worker until it disconnects.
+
+        A lease left behind by a worker that disconnects without releasing
+        it is reclaimed when it expires.
+
+        Args:
+            conn: The worker's connection.
+        """
+        client = object()
+        with conn:
+            while True:
+                try:
+                    op, tokens, spent = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if op == "lease":
+                    conn.send((self.lease(client, tokens, spent), self.lease_ttl))
+                elif op == "release":
+                    self.release(client, tokens, spent)
+                    conn.send(None)
+                else:
+                    conn.send(ValueError(f"unknown operation {op!r}"))
+
+
+class LeasedTokenBucket:
+    """Worker-side limiter that spends tokens leased from a QuotaCoordinator.
+
+    Requests are served from a local balance; when it runs dry the worker
+    asks the coordinator for another block of `block_size` tokens. Larger
+    blocks mean fewer round-trips but allow a burstier split between workers.
+    The balance expires with the lease; the expiry is measured from when the
+    lease request was sent, so it never outlives the coordinator's copy.
+    """
+
+    def __init__(self, address, authkey: bytes, block_size: int = 10):
+        """
+        Connect to a coordinator.
+
+        Args:
+            address: The coordinator's listener address.
+            authkey: Shared secret configured on the coordinator.
+            block_size: Number of tokens to lease per round-trip.
+
+        Raises:
+            ValueError: If `authkey` is empty.
+        """
+        if not authkey:
+            raise ValueError("authkey is required to authenticate with the coordinator")
+        self.block_size = block_size
+        self.tokens = 0
+        self._spent = 0
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = Client(address, authkey=authkey)
+
+    def allow_request(self, tokens: int = 1) -> bool:
+        """
+        Consume `tokens` from the local balance, leasing more if needed.
+
+        Args:
+            tokens: Number of tokens the request costs.
+
+        Returns:
+            True if the request is allowed, False if the global bucket is empty.
+
+        Raises:
+            ValueError: If `tokens` is less than 1.
+        """
+        if tokens < 1:
+            raise ValueError(f"tokens must be at least 1, got {tokens}")
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self.tokens = self._spent = 0
+            if self.tokens < tokens:
+                sent = time.monotonic()
+                granted, ttl = self._call("lease", max(self.block_size, tokens - self.tokens))
+                self.tokens += granted
+                self._spent = 0
+                self._expires_at = sent + ttl
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                self._spent += tokens
+                return True
+            return False
+
+    def close(self) -> None:
+        """Return any unused tokens to the coordinator and disconnect."""
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                self._call("release", self.tokens)
+            self.tokens = self._spent = 0
+            self._conn.close()
+
+    def _call(self, op: str, tokens: int):
+        """
+        Send one request to the coordinator and wait for the reply.
+
+        Args:
+            op: Either "lease" or "release".
+            tokens: Number of tokens involved.
+
+        Returns:
+            The coordinator's reply.
+        """
+        self._conn.send((op, tokens, self._spent))
+        reply = self._conn.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
@@ -3,12 +3,52 @@ LRU Cache - Solution
 
 A Least Recently Used cache with O(1) get and put operations,
 implemented using a doubly linked list and a hash map.
+
+ArrayLRUCache is a compact variant: instead of one Node object per entry, it
+keeps keys, values and prev/next links in parallel preallocated arrays with a
+free list, and adds bulk get_many/put_many, peek and resize. Run this module
+to benchmark it against LRUCache and functools.lru_cache.
+
+ConcurrentLRUCache is a thread-safe variant: keys are hashed to independent
+LRU segments with their own locks, and recency updates from get() are
+recorded in per-thread read buffers and replayed in batches, so readers
+rarely contend on a lock.
+
+PolicyLRUCache keeps the LRUCache get/put API but makes eviction pluggable:
+a weight (e.g. byte) budget with a user-supplied weigher, per-entry TTLs
+expired lazily on read and proactively by a TimerWheel, and an optional
+admission policy such as TinyLFU backed by a FrequencySketch.
+
+LoadingCache and AsyncLoadingCache wrap an LRUCache with get_or_load(): on a
+miss the loader runs once per key no matter how many callers are waiting
+(single-flight), hot entries are refreshed in the background before they
+expire, failures can be cached briefly, and hit/miss/load statistics are kept.
+
+SharedMemoryLRUCache lets pre-forked worker processes share one cache: the
+slot table, hash index and LRU links all live in a multiprocessing
+SharedMemory block, writers serialize on a process-shared lock, and readers
+can use a lock-free seqlock path that hands them a zero-copy view of a value.
 """
 
+import asyncio
+import functools
+import multiprocessing
+import random
+import threading
+import time
+import tracemalloc
+import zlib
+from array import array
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
 
 class Node:
     """Doubly linked list node for the LRU cache."""
 
+    __slots__ = ("key", "value", "prev", "next")
+
     def __init__(self, key: int = 0, value: int = 0):
         self.key = key
         self.value = value
@@ -96,3 +136,1470 @@ class LRUCache:
         node.next = self.head.next
         self.head.next.prev = node
         self.head.next = node
+
+
+class ArrayLRUCache:
+    """LRU cache whose linked list lives in parallel preallocated arrays.
+
+    Slot 0 is the sentinel of a circular list (next[0] is the most recently
+    used slot, prev[0] the least recently used). Slots 1..capacity hold
+    entries; unused slots are chained through `_next` as a free list. Links
+    are 32-bit C ints in `array` objects, so an entry costs two list slots
+    (key, value), two C ints and a dict entry instead of a Python object.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the cache.
+
+        Args:
+            capacity: Maximum number of items the cache can hold.
+        """
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        (Re)create empty storage for `capacity` entries.
+
+        Args:
+            capacity: Number of entry slots to allocate.
+        """
+        size = capacity + 1
+        self.capacity = capacity
+        self._index = {}
+        self._keys = [None] * size
+        self._values = [None] * size
+        self._prev = array("i", [0]) * size
+        # Free list threaded through _next: 1 -> 2 -> ... -> capacity -> 0 (end).
+        self._next = array("i", range(1, size + 1))
+        self._next[0] = 0
+        if capacity:
+            self._next[capacity] = 0
+        self._free = 1 if capacity else 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def _unlink(self, slot: int) -> None:
+        """Detach a slot from the recency list."""
+        prev, nxt = self._prev[slot], self._next[slot]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+
+    def _push_front(self, slot: int) -> None:
+        """Insert a detached slot at the most recently used position."""
+        first = self._next[0]
+        self._prev[slot] = 0
+        self._next[slot] = first
+        self._prev[first] = slot
+        self._next[0] = slot
+
+    def get(self, key: Hashable, default: Any = -1) -> Any:
+        """
+        Retrieve a value and mark it most recently used.
+
+        Args:
+            key: The key to look up.
+            default: Value returned on a miss.
+
+        Returns:
+            The value if found, `default` otherwise.
+        """
+        slot = self._index.get(key)
+        if slot is None:
+            return default
+        nxt = self._next
+        first = nxt[0]
+        if first != slot:
+            # Inlined _unlink + _push_front: this is the hot path.
+            prev = self._prev
+            p, n = prev[slot], nxt[slot]
+            nxt[p] = n
+            prev[n] = p
+            prev[slot] = 0
+            nxt[slot] = first
+            prev[first] = slot
+            nxt[0] = slot
+        return self._values[slot]
+
+    def peek(self, key: Hashable, default: Any = -1) -> Any:
+        """
+        Retrieve a value without changing its recency.
+
+        Args:
+            key: The key to look up.
+            default: Value returned on a miss.
+
+        Returns:
+            The value if found, `default` otherwise.
+        """
+        slot = self._index.get(key)
+        return default if slot is None else self._values[slot]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Insert or update a key-value pair, evicting the LRU entry if full.
+
+        Args:
+            key: The key to insert or update.
+            value: The value to associate with the key.
+        """
+        index = self._index
+        slot = index.get(key)
+        if slot is not None:
+            self._values[slot] = value
+            if self._next[0] != slot:
+                self._unlink(slot)
+                self._push_front(slot)
+            return
+        if not self.capacity:
+            return
+        if self._free:
+            slot = self._free
+            self._free = self._next[slot]
+        else:
+            slot = self._prev[0]
+            self._unlink(slot)
+            del index[self._keys[slot]]
+        self._keys[slot] = key
+        self._values[slot] = value
+        index[key] = slot
+        self._push_front(slot)
+
+    def get_many(self, keys: Iterable[Hashable], default: Any = -1) -> List[Any]:
+        """
+        Look up several keys, marking each hit most recently used.
+
+        Hits are promoted in iteration order, so the last key ends up most
+        recently used, exactly as with repeated get() calls.
+
+        Args:
+            keys: The keys to look up.
+            default: Value returned for each miss.
+
+        Returns:
+            A list with one value (or `default`) per key.
+        """
+        get = self.get
+        return [get(key, default) for key in keys]
+
+    def put_many(self, items: Iterable[Tuple[Hashable, Any]]) -> None:
+        """
+        Insert or update several key-value pairs in order.
+
+        Args:
+            items: (key, value) pairs, or a mapping.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        put = self.put
+        for key, value in items:
+            put(key, value)
+
+    def resize(self, capacity: int) -> None:
+        """
+        Change the capacity, evicting least recently used entries if shrinking.
+
+        Args:
+            capacity: The new maximum number of items.
+        """
+        entries = []
+        slot = self._next[0]
+        while slot and len(entries) < capacity:
+            entries.append((self._keys[slot], self._values[slot]))
+            slot = self._next[slot]
+        self._allocate(capacity)
+        # Reinsert from least to most recently used to preserve order.
+        self.put_many(reversed(entries))
+
+    def keys(self) -> List[Hashable]:
+        """
+        Return the cached keys from most to least recently used.
+
+        Returns:
+            A list of keys.
+        """
+        result = []
+        slot = self._next[0]
+        while slot:
+            result.append(self._keys[slot])
+            slot = self._next[slot]
+        return result
+
+
+class ConcurrentLRUCache:
+    """Thread-safe LRU cache built from lock-striped LRUCache segments.
+
+    Each key belongs to one of `num_segments` segments (by hash), each an
+    LRUCache guarded by its own lock, so writers to different segments never
+    block each other. get() looks the key up without taking the lock and
+    appends the hit to a per-thread read buffer; once the buffer fills, the
+    thread replays it under the segment lock with a non-blocking acquire
+    (in the style of Caffeine's read buffer). If the lock is busy and the
+    buffer has grown too large, the oldest recency hints are dropped, so
+    eviction order is approximately, not exactly, LRU.
+    """
+
+    READ_BUFFER_SIZE = 16
+    MAX_READ_BUFFER_SIZE = 64
+
+    def __init__(self, capacity: int, num_segments: int = 16):
+        """
+        Initialize the cache.
+
+        Args:
+            capacity: Maximum number of items across all segments.
+            num_segments: Number of independently locked segments, capped
+                at capacity so that every segment can hold an item.
+        """
+        self.capacity = capacity
+        num_segments = max(1, min(num_segments, capacity))
+        self.num_segments = num_segments
+        base, extra = divmod(capacity, num_segments)
+        self._segments = [LRUCache(base + (i < extra)) for i in range(num_segments)]
+        self._locks = [threading.Lock() for _ in range(num_segments)]
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return sum(len(segment.cache) for segment in self._segments)
+
+    def _buffers(self) -> List[List[Node]]:
+        """Return the calling thread's read buffers, one per segment."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = [[] for _ in range(self.num_segments)]
+        return buffers
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Retrieve a value from the cache.
+
+        Args:
+            key: The key to look up.
+
+        Returns:
+            The value if found, -1 otherwise.
+        """
+        i = hash(key) % self.num_segments
+        node = self._segments[i].cache.get(key)
+        if node is None:
+            return -1
+        buffer = self._buffers()[i]
+        buffer.append(node)
+        if len(buffer) >= self.READ_BUFFER_SIZE:
+            self._drain(i, buffer, blocking=False)
+        return node.value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Insert or update a key-value pair, evicting the segment's LRU entry if full.
+
+        Args:
+            key: The key to insert or update.
+            value: The value to associate with the key.
+        """
+        i = hash(key) % self.num_segments
+        with self._locks[i]:
+            self._replay(i, self._buffers()[i])
+            self._segments[i].put(key, value)
+
+    def _drain(self, i: int, buffer: List[Node], blocking: bool) -> None:
+        """
+        Apply buffered recency updates for segment `i` if its lock is free.
+
+        Args:
+            i: Segment index.
+            buffer: The calling thread's read buffer for that segment.
+            blocking: Wait for the lock instead of giving up when it is busy.
+        """
+        lock = self._locks[i]
+        if lock.acquire(blocking):
+            try:
+                self._replay(i, buffer)
+            finally:
+                lock.release()
+        elif len(buffer) >= self.MAX_READ_BUFFER_SIZE:
+            del buffer[: len(buffer) - self.READ_BUFFER_SIZE]
+
+    def _replay(self, i: int, buffer: List[Node]) -> None:
+        """
+        Move buffered nodes to the front of segment `i`; the caller holds its lock.
+
+        Args:
+            i: Segment index.
+            buffer: Nodes read since the last replay, oldest first.
+        """
+        segment = self._segments[i]
+        for node in buffer:
+            # Skip nodes evicted or replaced since they were read.
+            if segment.cache.get(node.key) is node:
+                segment._remove(node)
+                segment._add_to_front(node)
+        buffer.clear()
+
+
+# Halves every byte in a sketch table via bytes.translate (TinyLFU aging).
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access frequencies with periodic aging.
+
+    Four rows of saturating 4-bit-range counters (stored one per byte). Once
+    `sample_size` increments have been recorded every counter is halved, so
+    the sketch tracks recent rather than all-time popularity.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5)
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the sketch.
+
+        Args:
+            capacity: Expected number of cached entries; sizes the table and
+                the aging period (10x capacity increments).
+        """
+        width = 1
+        while width < max(16, capacity):
+            width <<= 1
+        self._mask = width - 1
+        self._width = width
+        self._table = bytearray(width * self.DEPTH)
+        self.sample_size = 10 * max(1, capacity)
+        self._additions = 0
+
+    def _slots(self, key: Hashable) -> List[int]:
+        """Return the counter position of `key` in each row."""
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        width, mask = self._width, self._mask
+        return [
+            row * width + ((((h * seed) & 0xFFFFFFFFFFFFFFFF) >> 32) & mask)
+            for row, seed in enumerate(self._SEEDS)
+        ]
+
+    def increment(self, key: Hashable) -> None:
+        """
+        Record one access to `key`.
+
+        Args:
+            key: The accessed key.
+        """
+        table = self._table
+        for slot in self._slots(key):
+            if table[slot] < self.MAX_COUNT:
+                table[slot] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._table = bytearray(bytes(self._table).translate(_HALVE))
+            self._additions //= 2
+
+    def estimate(self, key: Hashable) -> int:
+        """
+        Estimate how often `key` was accessed recently.
+
+        Args:
+            key: The key to look up.
+
+        Returns:
+            The minimum counter across rows (an upper bound on the true count).
+        """
+        table = self._table
+        return min(table[slot] for slot in self._slots(key))
+
+
+class TinyLFU:
+    """TinyLFU admission policy (Einziger, Friedman & Manes, 2017).
+
+    A new key is admitted only if it has been seen more often recently than
+    the entry it would evict, which keeps one-hit wonders and scans from
+    flushing popular entries out of the cache.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the policy.
+
+        Args:
+            capacity: Expected number of cached entries.
+        """
+        self.sketch = FrequencySketch(capacity)
+
+    def record(self, key: Hashable) -> None:
+        """
+        Record an access (hit or miss) to `key`.
+
+        Args:
+            key: The accessed key.
+        """
+        self.sketch.increment(key)
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        """
+        Decide whether `candidate` may replace `victim`.
+
+        Args:
+            candidate: Key being inserted.
+            victim: Key that would be evicted to make room.
+
+        Returns:
+            True if the candidate is strictly more popular than the victim.
+        """
+        return self.sketch.estimate(candidate) > self.sketch.estimate(victim)
+
+
+class TimerWheel:
+    """Hashed timer wheel for proactive expiry.
+
+    Each of `num_slots` buckets covers `tick` seconds; an entry expiring at
+    time t lives in bucket floor(t / tick) mod num_slots. advance() visits
+    only the buckets whose ticks have fully elapsed, so expiring entries
+    costs O(expired + elapsed ticks) instead of a scan of the whole cache.
+    Entries more than one revolution away simply stay in their bucket until
+    a later pass finds them due.
+    """
+
+    def __init__(self, tick: float = 1.0, num_slots: int = 256, start: float = 0.0):
+        """
+        Initialize the wheel.
+
+        Args:
+            tick: Seconds covered by one bucket.
+            num_slots: Number of buckets in one revolution.
+            start: Current time.
+        """
+        self.tick = tick
+        self.slots = [set() for _ in range(num_slots)]
+        self._current = int(start // tick)
+
+    def schedule(self, key: Hashable, expires_at: float) -> int:
+        """
+        Add a key to the bucket for its expiry time.
+
+        Args:
+            key: The key to schedule.
+            expires_at: Absolute expiry time.
+
+        Returns:
+            The bucket index, needed to cancel the timer later.
+        """
+        slot = int(expires_at // self.tick) % len(self.slots)
+        self.slots[slot].add(key)
+        return slot
+
+    def cancel(self, key: Hashable, slot: int) -> None:
+        """
+        Remove a key from a bucket.
+
+        Args:
+            key: The key to unschedule.
+            slot: The bucket index returned by schedule().
+        """
+        self.slots[slot].discard(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Move the wheel to `now` and return keys that may have expired.
+
+        Args:
+            now: The current time.
+
+        Returns:
+            Keys from every bucket whose tick has fully elapsed; the caller
+            must still compare each entry's expiry with `now`.
+        """
+        target = int(now // self.tick)
+        ticks = min(target - self._current, len(self.slots))
+        due = []
+        for t in range(self._current, self._current + ticks):
+            due.extend(self.slots[t % len(self.slots)])
+        self._current = max(self._current, target)
+        return due
+
+
+class PolicyNode(Node):
+    """LRU node that also tracks weight, expiry and timer-wheel bucket."""
+
+    __slots__ = ("weight", "expires_at", "wheel_slot")
+
+    def __init__(self, key: Hashable, value: Any, weight: int, expires_at: Optional[float]):
+        super().__init__(key, value)
+        self.weight = weight
+        self.expires_at = expires_at
+        self.wheel_slot = None
+
+
+class PolicyLRUCache(LRUCache):
+    """LRU cache with pluggable capacity, expiry and admission policies.
+
+    With the defaults it behaves exactly like LRUCache. Options:
+
+    - weigher(key, value) -> int turns `capacity` into a weight budget
+      (e.g. bytes); entries are evicted from the LRU end until the total
+      weight fits, and an entry heavier than the whole budget is rejected.
+    - ttl (seconds) sets a default expiry, overridable per put(). Expired
+      entries are dropped lazily by get() and proactively by expire(), which
+      put() also calls, via a TimerWheel.
+    - admission (e.g. TinyLFU) sees every access and may refuse a new key
+      that would evict a more popular one.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        weigher: Callable[[Hashable, Any], int] = None,
+        ttl: float = None,
+        admission: TinyLFU = None,
+        clock: Callable[[], float] = time.monotonic,
+        wheel_tick: float = 1.0,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            capacity: Maximum total weight (entry count without a weigher).
+            weigher: Returns the weight of an entry; defaults to 1 per entry.
+            ttl: Default time-to-live in seconds, or None for no expiry.
+            admission: Admission policy with record(key)/admit(candidate, victim).
+            clock: Time source, in seconds.
+            wheel_tick: Resolution of the expiry timer wheel in seconds.
+        """
+        super().__init__(capacity)
+        self.weigher = weigher
+        self.ttl = ttl
+        self.admission = admission
+        self.clock = clock
+        self.total_weight = 0
+        self._wheel = TimerWheel(wheel_tick, start=clock())
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Retrieve a live value from the cache.
+
+        Args:
+            key: The key to look up.
+
+        Returns:
+            The value if found and not expired, -1 otherwise.
+        """
+        if self.admission is not None:
+            self.admission.record(key)
+        node = self.cache.get(key)
+        if node is None:
+            return -1
+        if node.expires_at is not None and self.clock() >= node.expires_at:
+            self._delete(node)
+            return -1
+        self._remove(node)
+        self._add_to_front(node)
+        return node.value
+
+    def put(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        """
+        Insert or update a key-value pair, evicting entries as the policy requires.
+
+        Args:
+            key: The key to insert or update.
+            value: The value to associate with the key.
+            ttl: Time-to-live for this entry; defaults to the cache's ttl.
+        """
+        now = self.clock()
+        self.expire(now)
+        if self.admission is not None:
+            self.admission.record(key)
+        weight = self.weigher(key, value) if self.weigher else 1
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+
+        node = self.cache.get(key)
+        if node is not None:
+            self.total_weight += weight - node.weight
+            node.value = value
+            node.weight = weight
+            self._set_expiry(node, expires_at)
+            self._remove(node)
+            self._add_to_front(node)
+            while self.total_weight > self.capacity:
+                self._delete(self.tail.prev)
+            return
+
+        if weight > self.capacity:
+            return
+        # Pick victims first so a rejected admission leaves the cache untouched.
+        victims = []
+        freed = 0
+        victim = self.tail.prev
+        while self.total_weight - freed + weight > self.capacity:
+            expired = victim.expires_at is not None and now >= victim.expires_at
+            if not expired and self.admission is not None and not self.admission.admit(key, victim.key):
+                return
+            victims.append(victim)
+            freed += victim.weight
+            victim = victim.prev
+        for victim in victims:
+            self._delete(victim)
+
+        node = PolicyNode(key, value, weight, None)
+        self._set_expiry(node, expires_at)
+        self.cache[key] = node
+        self.total_weight += weight
+        self._add_to_front(node)
+
+    def expire(self, now: float = None) -> int:
+        """
+        Proactively drop entries whose TTL has passed.
+
+        Args:
+            now: Current time; defaults to the cache's clock.
+
+        Returns:
+            Number of entries removed.
+        """
+        now = self.clock() if now is None else now
+        removed = 0
+        for key in self._wheel.advance(now):
+            node = self.cache.get(key)
+            if node is not None and node.expires_at is not None and now >= node.expires_at:
+                self._delete(node)
+                removed += 1
+        return removed
+
+    def _set_expiry(self, node: PolicyNode, expires_at: Optional[float]) -> None:
+        """Update a node's expiry and move it to the matching wheel bucket."""
+        if node.wheel_slot is not None:
+            self._wheel.cancel(node.key, node.wheel_slot)
+            node.wheel_slot = None
+        node.expires_at = expires_at
+        if expires_at is not None:
+            node.wheel_slot = self._wheel.schedule(node.key, expires_at)
+
+    def _delete(self, node: PolicyNode) -> None:
+        """Remove a node from the list, the index, the wheel and the weight total."""
+        self._remove(node)
+        del self.cache[node.key]
+        self.total_weight -= node.weight
+        if node.wheel_slot is not None:
+            self._wheel.cancel(node.key, node.wheel_slot)
+
+
+@dataclass
+class CacheStats:
+    """Counters kept by a LoadingCache.
+
+    Attributes:
+        hits: Lookups served from a live cache entry.
+        misses: Lookups that found no live entry.
+        load_successes: Loader calls that returned a value.
+        load_failures: Loader calls that raised.
+        total_load_time: Seconds spent in loader calls.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    load_successes: int = 0
+    load_failures: int = 0
+    total_load_time: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were hits."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def average_load_time(self) -> float:
+        """Mean seconds per loader call."""
+        loads = self.load_successes + self.load_failures
+        return self.total_load_time / loads if loads else 0.0
+
+
+class _Entry:
+    """A cached load result: a value or the exception the loader raised."""
+
+    __slots__ = ("value", "error", "expires_at", "refresh_at")
+
+    def __init__(self, value, error, expires_at, refresh_at):
+        self.value = value
+        self.error = error
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+    def result(self) -> Any:
+        """Return the value, or re-raise the cached error."""
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _Flight:
+    """An in-progress load that other threads can wait on."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self) -> Any:
+        """Wait for the load to finish and return its value or raise its error."""
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class LoadingCache:
+    """LRU cache that loads missing values itself, once per key.
+
+    get_or_load(key, loader) returns the cached value or calls loader(key).
+    Concurrent callers that miss on the same key share one loader call
+    (single-flight). With `refresh_ahead`, a hit on an entry older than that
+    fraction of its TTL triggers a background reload while the current value
+    keeps being served. Loader exceptions and None results are cached for
+    `negative_ttl` seconds so a failing or absent key is not hammered.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl: float = None,
+        refresh_ahead: float = None,
+        negative_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the loading cache.
+
+        Args:
+            capacity: Maximum number of entries.
+            ttl: Seconds a loaded value stays valid, or None for no expiry.
+            refresh_ahead: Fraction of `ttl` (0 < f < 1) after which a hit
+                schedules a background refresh; None disables it.
+            negative_ttl: Seconds to cache loader errors and None results;
+                0 disables negative caching.
+            clock: Time source, in seconds.
+        """
+        if refresh_ahead is not None and (ttl is None or not 0 < refresh_ahead < 1):
+            raise ValueError("refresh_ahead must be a fraction in (0, 1) and requires ttl")
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._cache = LRUCache(capacity)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """
+        Return the cached value for `key`, loading it with `loader` on a miss.
+
+        Args:
+            key: The key to look up.
+            loader: Called as loader(key) to produce the value.
+
+        Returns:
+            The cached or freshly loaded value.
+
+        Raises:
+            Exception: Whatever the loader raised (possibly a cached error).
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                if self._needs_refresh(entry) and key not in self._inflight:
+                    flight = self._inflight[key] = _Flight()
+                    threading.Thread(
+                        target=self._run_load, args=(key, loader, flight, True), daemon=True
+                    ).start()
+                return entry.result()
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+        if owner:
+            self._run_load(key, loader, flight, False)
+        return flight.result()
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop any cached entry for `key` so the next lookup reloads it.
+
+        Args:
+            key: The key to invalidate.
+        """
+        with self._lock:
+            node = self._cache.cache.pop(key, None)
+            if node is not None:
+                self._cache._remove(node)
+
+    def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        """Return the live entry for `key` and count the hit or miss."""
+        entry = self._cache.get(key)
+        if isinstance(entry, _Entry) and (entry.expires_at is None or self.clock() < entry.expires_at):
+            self.stats.hits += 1
+            return entry
+        self.stats.misses += 1
+        return None
+
+    def _needs_refresh(self, entry: _Entry) -> bool:
+        """Whether a hit on `entry` should schedule a background reload."""
+        return entry.refresh_at is not None and self.clock() >= entry.refresh_at
+
+    def _run_load(self, key: Hashable, loader: Callable, flight: _Flight, refresh: bool) -> None:
+        """
+        Call the loader, record the outcome and release waiters.
+
+        If the loader raises a BaseException such as KeyboardInterrupt,
+        nothing is cached, the waiters receive that exception and it
+        propagates to the caller; the key is always released so the next
+        lookup starts a fresh load.
+        """
+        start = time.perf_counter()
+        value, error = None, None
+        try:
+            try:
+                value = loader(key)
+            except Exception as exc:
+                error = exc
+            with self._lock:
+                self._complete(key, value, error, time.perf_counter() - start, refresh)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.value, flight.error = value, error
+            flight.event.set()
+
+    def _complete(self, key: Hashable, value: Any, error: Exception, elapsed: float, refresh: bool) -> None:
+        """
+        Store a load result and update stats; the caller holds the lock.
+
+        A failed background refresh keeps the previous value, which is still
+        valid until its own expiry.
+        """
+        self._inflight.pop(key, None)
+        self.stats.total_load_time += elapsed
+        if error is not None:
+            self.stats.load_failures += 1
+        else:
+            self.stats.load_successes += 1
+        if error is not None and refresh:
+            return
+
+        now = self.clock()
+        if error is not None or value is None:
+            if not self.negative_ttl:
+                return
+            self._cache.put(key, _Entry(value, error, now + self.negative_ttl, None))
+            return
+        expires_at = now + self.ttl if self.ttl is not None else None
+        refresh_at = now + self.refresh_ahead * self.ttl if self.refresh_ahead else None
+        self._cache.put(key, _Entry(value, None, expires_at, refresh_at))
+
+
+class AsyncLoadingCache(LoadingCache):
+    """asyncio flavor of LoadingCache; loaders are coroutine functions.
+
+    Waiters share the in-flight load through asyncio.shield(), so a caller
+    that is cancelled does not cancel the load for everyone else.
+    """
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """
+        Return the cached value for `key`, awaiting `loader(key)` on a miss.
+
+        Args:
+            key: The key to look up.
+            loader: Coroutine function called as await loader(key).
+
+        Returns:
+            The cached or freshly loaded value.
+
+        Raises:
+            Exception: Whatever the loader raised (possibly a cached error).
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            if self._needs_refresh(entry) and key not in self._inflight:
+                self._inflight[key] = asyncio.ensure_future(self._load(key, loader, True))
+            return entry.result()
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._load(key, loader, False))
+        value, error = await asyncio.shield(task)
+        if error is not None:
+            raise error
+        return value
+
+    async def _load(self, key: Hashable, loader: Callable, refresh: bool) -> Tuple[Any, Exception]:
+        """
+        Await the loader and record the outcome.
+
+        A cancelled load is not cached: its task is dropped from the
+        in-flight table so the next caller starts a fresh load.
+        """
+        start = time.perf_counter()
+        value, error = None, None
+        try:
+            try:
+                value = await loader(key)
+            except Exception as exc:
+                error = exc
+            self._complete(key, value, error, time.perf_counter() - start, refresh)
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        return value, error
+
+
+class SharedMemoryLRUCache:
+    """Fixed-size bytes -> bytes LRU cache in shared memory, usable across processes.
+
+    Layout of the SharedMemory block (all integers are C int32):
+
+        header[16]       magic, capacity, index size, max key/value size,
+                         free-list head, entry count, seqlock counter
+        prev/next[C+1]   intrusive LRU links; slot 0 is the list sentinel
+        key_len/value_len/key_hash[C+1]
+        index[I]         open-addressing (linear probing) table of slot
+                         numbers, 0 = empty; I is a power of two >= 2C
+        data             (C+1) fixed-size slots of max_key + max_value bytes
+
+    Every mutation happens under `lock`, a multiprocessing.Lock that must be
+    shared with the other processes (inherited across fork or passed to
+    attach()). Writers that change the index or slot contents bump the
+    seqlock counter to odd before and back to even after, so read() can look
+    a key up without the lock and retry if a writer interfered. Deletion uses
+    backward-shift instead of tombstones, so the index never degrades.
+    """
+
+    MAGIC = 0x4C525543
+    _HEADER_INTS = 16
+    _FREE, _COUNT, _SEQ = 5, 6, 7
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        max_key_size: int = 64,
+        max_value_size: int = 1024,
+        name: str = None,
+        lock=None,
+        create: bool = True,
+    ):
+        """
+        Create a new shared cache, or attach to an existing one.
+
+        Args:
+            capacity: Maximum number of entries (ignored when attaching).
+            max_key_size: Maximum key length in bytes (ignored when attaching).
+            max_value_size: Maximum value length in bytes (ignored when attaching).
+            name: SharedMemory name; None picks one when creating.
+            lock: Process-shared lock; a new multiprocessing.Lock if creating
+                and None. Processes that attach must pass the creator's lock.
+            create: Create the block (True) or attach to `name` (False).
+        """
+        if create:
+            index_size = 1
+            while index_size < 2 * capacity:
+                index_size <<= 1
+            header = [self.MAGIC, capacity, index_size, max_key_size, max_value_size, 0, 0, 0]
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True,
+                size=self._layout_size(capacity, index_size, max_key_size, max_value_size),
+            )
+        else:
+            if lock is None:
+                raise ValueError("attaching requires the creator's lock")
+            self._shm = shared_memory.SharedMemory(name=name)
+            header = self._shm.buf[: 4 * self._HEADER_INTS].cast("i")
+            try:
+                if header[0] != self.MAGIC:
+                    raise ValueError(f"shared memory {name!r} does not hold an LRU cache")
+                capacity, index_size, max_key_size, max_value_size = header[1:5]
+            finally:
+                header.release()
+
+        self.name = self._shm.name
+        self.capacity = capacity
+        self.max_key_size = max_key_size
+        self.max_value_size = max_value_size
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        self._index_mask = index_size - 1
+        self._stride = max_key_size + max_value_size
+        self._map_views(capacity, index_size)
+
+        if create:
+            self._header[: len(header)] = array("i", header)
+            # Free list threaded through next: 1 -> 2 -> ... -> capacity -> 0.
+            for slot in range(1, capacity):
+                self._next[slot] = slot + 1
+            self._header[self._FREE] = 1 if capacity else 0
+
+    @classmethod
+    def attach(cls, name: str, lock) -> "SharedMemoryLRUCache":
+        """
+        Attach to a cache created by another process.
+
+        Args:
+            name: The creator's `name` attribute.
+            lock: The creator's `lock` attribute.
+
+        Returns:
+            A handle on the shared cache.
+        """
+        return cls(name=name, lock=lock, create=False)
+
+    @classmethod
+    def _layout_size(cls, capacity: int, index_size: int, max_key: int, max_value: int) -> int:
+        """Bytes needed for the header, arrays and data slots."""
+        ints = cls._HEADER_INTS + 5 * (capacity + 1) + index_size
+        return 8 * ((4 * ints + 7) // 8) + (capacity + 1) * (max_key + max_value)
+
+    def _map_views(self, capacity: int, index_size: int) -> None:
+        """Create typed memoryviews over each region of the block."""
+        buf = self._shm.buf
+        offset = 0
+
+        def ints(count):
+            nonlocal offset
+            view = buf[offset:offset + 4 * count].cast("i")
+            offset += 4 * count
+            return view
+
+        self._header = ints(self._HEADER_INTS)
+        self._prev = ints(capacity + 1)
+        self._next = ints(capacity + 1)
+        self._key_len = ints(capacity + 1)
+        self._value_len = ints(capacity + 1)
+        self._key_hash = ints(capacity + 1)
+        self._index = ints(index_size)
+        offset = 8 * ((offset + 7) // 8)
+        self._data = buf[offset:offset + (capacity + 1) * self._stride]
+        self._views = [
+            self._header, self._prev, self._next, self._key_len,
+            self._value_len, self._key_hash, self._index, self._data,
+        ]
+
+    def __len__(self) -> int:
+        return self._header[self._COUNT]
+
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        """Process-independent hash of a key (built-in hash() is salted)."""
+        return zlib.crc32(key) & 0x7FFFFFFF
+
+    def _find(self, key: bytes, h: int) -> Tuple[int, int]:
+        """
+        Probe the index for `key`.
+
+        Returns:
+            (position, slot): the index position holding the key and its slot,
+            or the first empty position and slot 0 if the key is absent.
+        """
+        index, mask = self._index, self._index_mask
+        key_hash, key_len, data, stride = self._key_hash, self._key_len, self._data, self._stride
+        pos = h & mask
+        for _ in range(mask + 1):
+            slot = index[pos]
+            if slot == 0:
+                return pos, 0
+            if key_hash[slot] == h and key_len[slot] == len(key):
+                start = slot * stride
+                if data[start:start + len(key)] == key:
+                    return pos, slot
+            pos = (pos + 1) & mask
+        return pos, 0
+
+    def _value_view(self, slot: int) -> memoryview:
+        """Zero-copy view of the value stored in `slot`."""
+        start = slot * self._stride + self.max_key_size
+        return self._data[start:start + self._value_len[slot]]
+
+    def _begin_write(self) -> None:
+        """Bump the seqlock counter (odd while a write is in progress)."""
+        self._header[self._SEQ] = (self._header[self._SEQ] + 1) % (1 << 30)
+
+    _end_write = _begin_write
+
+    def _unlink(self, slot: int) -> None:
+        """Detach a slot from the recency list."""
+        prev, nxt = self._prev[slot], self._next[slot]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+
+    def _push_front(self, slot: int) -> None:
+        """Insert a detached slot at the most recently used position."""
+        first = self._next[0]
+        self._prev[slot] = 0
+        self._next[slot] = first
+        self._prev[first] = slot
+        self._next[0] = slot
+
+    def _index_delete(self, pos: int) -> None:
+        """Remove the entry at index position `pos` by backward-shift deletion."""
+        index, mask, key_hash = self._index, self._index_mask, self._key_hash
+        hole = pos
+        probe = pos
+        while True:
+            probe = (probe + 1) & mask
+            slot = index[probe]
+            if slot == 0:
+                break
+            home = key_hash[slot] & mask
+            # Leave the entry if its home lies cyclically in (hole, probe].
+            if (hole < probe and hole < home <= probe) or (hole > probe and (home > hole or home <= probe)):
+                continue
+            index[hole] = slot
+            hole = probe
+        index[hole] = 0
+
+    def _remove_slot(self, slot: int) -> None:
+        """Drop `slot` from the index and LRU list and return it to the free list."""
+        start = slot * self._stride
+        key = bytes(self._data[start:start + self._key_len[slot]])
+        pos, found = self._find(key, self._key_hash[slot])
+        if found == slot:
+            self._index_delete(pos)
+        self._unlink(slot)
+        self._next[slot] = self._header[self._FREE]
+        self._header[self._FREE] = slot
+        self._header[self._COUNT] -= 1
+
+    def get(self, key: bytes, default: Any = None) -> Any:
+        """
+        Retrieve a copy of a value and mark it most recently used.
+
+        Args:
+            key: The key to look up.
+            default: Value returned on a miss.
+
+        Returns:
+            The value as bytes, or `default`.
+        """
+        with self.lock:
+            _, slot = self._find(key, self._hash(key))
+            if not slot:
+                return default
+            if self._next[0] != slot:
+                # Only the links change, which read() never follows: no seqlock bump.
+                self._unlink(slot)
+                self._push_front(slot)
+            return bytes(self._value_view(slot))
+
+    def read(self, key: bytes, fn: Callable[[memoryview], Any], default: Any = None, retries: int = 64) -> Any:
+        """
+        Apply `fn` to a zero-copy view of the value without taking the lock.
+
+        The lookup is validated with the seqlock and retried if a writer ran
+        concurrently, falling back to the lock after `retries` attempts. `fn`
+        may therefore run more than once and must not keep the view. Recency
+        is not updated.
+
+        Args:
+            key: The key to look up.
+            fn: Called with a memoryview of the value, e.g. bytes or json.loads.
+            default: Value returned on a miss.
+            retries: Optimistic attempts before locking.
+
+        Returns:
+            fn(view) for a hit, `default` otherwise.
+        """
+        h = self._hash(key)
+        header, seq_index = self._header, self._SEQ
+        for _ in range(retries):
+            before = header[seq_index]
+            if before & 1:
+                continue
+            try:
+                _, slot = self._find(key, h)
+                result = fn(self._value_view(slot)) if slot else default
+            except Exception:
+                if header[seq_index] == before:
+                    raise
+                continue
+            if header[seq_index] == before:
+                return result
+        with self.lock:
+            _, slot = self._find(key, h)
+            return fn(self._value_view(slot)) if slot else default
+
+    def peek(self, key: bytes, default: Any = None) -> Any:
+        """
+        Lock-free copy of a value without changing its recency.
+
+        Args:
+            key: The key to look up.
+            default: Value returned on a miss.
+
+        Returns:
+            The value as bytes, or `default`.
+        """
+        return self.read(key, bytes, default)
+
+    def put(self, key: bytes, value: bytes) -> None:
+        """
+        Insert or update an entry, evicting the least recently used if full.
+
+        Args:
+            key: The key, at most max_key_size bytes.
+            value: The value, at most max_value_size bytes.
+
+        Raises:
+            ValueError: If the key or value exceeds its slot size.
+        """
+        if len(key) > self.max_key_size or len(value) > self.max_value_size:
+            raise ValueError("key or value exceeds the configured slot size")
+        if not self.capacity:
+            return
+        h = self._hash(key)
+        with self.lock:
+            self._begin_write()
+            try:
+                _, slot = self._find(key, h)
+                if not slot:
+                    slot = self._header[self._FREE]
+                    if slot:
+                        self._header[self._FREE] = self._next[slot]
+                    else:
+                        self._remove_slot(self._prev[0])
+                        slot = self._header[self._FREE]
+                        self._header[self._FREE] = self._next[slot]
+                    start = slot * self._stride
+                    self._data[start:start + len(key)] = key
+                    self._key_len[slot] = len(key)
+                    self._key_hash[slot] = h
+                    pos, _ = self._find(key, h)
+                    self._index[pos] = slot
+                    self._header[self._COUNT] += 1
+                    self._push_front(slot)
+                elif self._next[0] != slot:
+                    self._unlink(slot)
+                    self._push_front(slot)
+                start = slot * self._stride + self.max_key_size
+                self._data[start:start + len(value)] = value
+                self._value_len[slot] = len(value)
+            finally:
+                self._end_write()
+
+    def delete(self, key: bytes) -> bool:
+        """
+        Remove an entry.
+
+        Args:
+            key: The key to remove.
+
+        Returns:
+            True if the key was present.
+        """
+        with self.lock:
+            _, slot = self._find(key, self._hash(key))
+            if not slot:
+                return False
+            self._begin_write()
+            try:
+                self._remove_slot(slot)
+            finally:
+                self._end_write()
+            return True
+
+    def close(self) -> None:
+        """Detach this process from the shared block."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the shared block; call once, from the creating process."""
+        self._shm.unlink()
+
+
+def _measure_memory(build) -> int:
+    """Return the bytes still allocated after calling build()."""
+    tracemalloc.start()
+    container = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return current
+
+
+def benchmark(capacity: int = 100_000, num_ops: int = 1_000_000, seed: int = 0) -> None:
+    """
+    Compare memory per entry and throughput of LRUCache, ArrayLRUCache and
+    functools.lru_cache on a skewed (exponential) key trace.
+
+    Args:
+        capacity: Cache capacity for every implementation.
+        num_ops: Number of operations in the trace.
+        seed: Random seed for the trace.
+    """
+    rng = random.Random(seed)
+    trace = [int(rng.expovariate(1 / capacity)) for _ in range(num_ops)]
+    fill_keys = list(range(capacity))
+
+    def fill(cache):
+        for key in fill_keys:
+            cache.put(key, key)
+        return cache
+
+    def fill_functools():
+        cached = functools.lru_cache(maxsize=capacity)(lambda key: key)
+        for key in fill_keys:
+            cached(key)
+        return cached
+
+    print(f"capacity={capacity:,} ops={num_ops:,}")
+    print(f"{'implementation':<20} {'bytes/entry':>12} {'ops/sec':>14} {'hit ratio':>10}")
+    for name in ("LRUCache", "ArrayLRUCache", "functools.lru_cache"):
+        if name == "functools.lru_cache":
+            mem = _measure_memory(fill_functools)
+            cached = functools.lru_cache(maxsize=capacity)(lambda key: key)
+            start = time.perf_counter()
+            for key in trace:
+                cached(key)
+            elapsed = time.perf_counter() - start
+            info = cached.cache_info()
+            hits = info.hits
+        else:
+            cls = LRUCache if name == "LRUCache" else ArrayLRUCache
+            mem = _measure_memory(lambda: fill(cls(capacity)))
+            cache = cls(capacity)
+            hits = 0
+            start = time.perf_counter()
+            for key in trace:
+                if cache.get(key) == -1:
+                    cache.put(key, key)
+                else:
+                    hits += 1
+            elapsed = time.perf_counter() - start
+        print(f"{name:<20} {mem / capacity:>12.1f} {num_ops / elapsed:>14,.0f} {hits / num_ops:>10.3f}")
+
+
+def benchmark_threads(
+    capacity: int = 100_000, ops_per_thread: int = 200_000, thread_counts=(1, 2, 4, 8)
+) -> None:
+    """
+    Compare get-heavy throughput of LRUCache behind one global lock with
+    ConcurrentLRUCache as the number of threads grows.
+
+    Args:
+        capacity: Cache capacity.
+        ops_per_thread: get() calls issued by each thread.
+        thread_counts: Thread counts to test.
+    """
+
+    class GlobalLockLRU:
+        def __init__(self, capacity):
+            self._cache = LRUCache(capacity)
+            self._lock = threading.Lock()
+
+        def get(self, key):
+            with self._lock:
+                return self._cache.get(key)
+
+        def put(self, key, value):
+            with self._lock:
+                self._cache.put(key, value)
+
+    print(f"{'implementation':<20} {'threads':>8} {'gets/sec':>14}")
+    for cls in (GlobalLockLRU, ConcurrentLRUCache):
+        for num_threads in thread_counts:
+            cache = cls(capacity)
+            for key in range(capacity):
+                cache.put(key, key)
+            traces = [
+                [random.Random(t).randrange(capacity) for _ in range(ops_per_thread)]
+                for t in range(num_threads)
+            ]
+
+            def worker(trace):
+                get = cache.get
+                for key in trace:
+                    get(key)
+
+            threads = [threading.Thread(target=worker, args=(trace,)) for trace in traces]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            print(f"{cls.__name__:<20} {num_threads:>8} {num_threads * ops_per_thread / elapsed:>14,.0f}")
+
+
+def benchmark_policies(
+    budget_bytes: int = 4_000_000,
+    num_keys: int = 100_000,
+    num_requests: int = 500_000,
+    zipf_s: float = 0.9,
+    seed: int = 0,
+) -> None:
+    """
+    Replay a skewed trace with variable object sizes and periodic scans, and
+    compare hit ratios of the policies under the same byte budget.
+
+    Args:
+        budget_bytes: Cache size in bytes (for the entry-count LRUCache, the
+            budget divided by the mean object size).
+        num_keys: Number of distinct popular keys.
+        num_requests: Length of the trace.
+        zipf_s: Zipf exponent of key popularity.
+        seed: Random seed.
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank ** zipf_s) for rank in range(1, num_keys + 1)]
+    trace = rng.choices(range(num_keys), weights=weights, k=num_requests)
+    # Every 50K requests, a one-off scan of 5K never-repeated keys.
+    for start in range(0, num_requests, 50_000):
+        trace[start:start] = [f"scan-{start}-{i}" for i in range(5_000)]
+    sizes = {}
+
+    def size_of(key, value=None):
+        if key not in sizes:
+            sizes[key] = int(rng.lognormvariate(7, 1)) + 64
+        return sizes[key]
+
+    for key in trace:
+        size_of(key)
+    mean_size = sum(sizes.values()) / len(sizes)
+
+    caches = {
+        "LRUCache (count)": LRUCache(int(budget_bytes / mean_size)),
+        "LRU by bytes": PolicyLRUCache(budget_bytes, weigher=size_of),
+        "LRU by bytes+TinyLFU": PolicyLRUCache(
+            budget_bytes, weigher=size_of, admission=TinyLFU(int(budget_bytes / mean_size))
+        ),
+    }
+    print(f"budget={budget_bytes / 1e6:.1f} MB requests={len(trace):,} mean size={mean_size:.0f} B")
+    print(f"{'policy':<22} {'hit ratio':>10} {'byte hit ratio':>15} {'hits/MB':>10}")
+    total_bytes = sum(sizes[key] for key in trace)
+    for name, cache in caches.items():
+        hits = hit_bytes = 0
+        for key in trace:
+            if cache.get(key) != -1:
+                hits += 1
+                hit_bytes += sizes[key]
+            else:
+                cache.put(key, key)
+        print(f"{name:<22} {hits / len(trace):>10.3f} {hit_bytes / total_bytes:>15.3f} "
+              f"{hits / (budget_bytes / 1e6):>10,.0f}")
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark_threads()
+    benchmark_policies()
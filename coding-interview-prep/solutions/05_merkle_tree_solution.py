@@ -4,10 +4,255 @@ Merkle Tree - Solution
 A hash tree used for efficient data verification and synchronization.
 Each leaf node is a hash of a data block, and each internal node is
 a hash of its children's hashes.
+
+FlatMerkleTree stores the same shape of tree (odd nodes paired with
+themselves) as one contiguous bytearray of raw 32-byte SHA-256 digests per
+level instead of MerkleNode objects and hex strings. Updating or appending a
+leaf rehashes only its O(log n) path, and proofs are read straight from the
+stored levels. Because parents hash raw digests rather than hex text, its
+root hashes differ from MerkleTree's.
+
+ParallelMerkleBuilder builds a FlatMerkleTree from a stream of blocks or a
+file by hashing aligned, power-of-two chunks of leaves (and their lower
+subtree levels) in a process or thread pool, then stitching the chunk levels
+together and hashing the few remaining upper levels serially.
+
+DiskMerkleTree keeps the levels in a file instead of memory: a file is cut
+into fixed-size or content-defined chunks, leaf hashes are streamed to the
+levels file, upper levels are hashed from it in bounded buffers, and
+queries are served from an mmap, so trees over very large datasets need
+only a few MB of RAM.
+
+MultiProof authenticates many leaves at once: sibling hashes shared by
+several audit paths, or derivable from the requested leaves themselves, are
+sent only once. verify_many checks a batch of single proofs, hashing each
+distinct internal node only once.
+
+sync_serve and sync_pull reconcile two FlatMerkleTrees over any byte stream
+(a socket or pipe): the client is sent one batch of node hashes per round,
+starting near the root, answers with a bitmap of the nodes that differ, and
+is then sent only the children (k-ary, k levels of fan-out at a time) of
+those nodes, until the differing leaves are known and their blocks are sent.
 """
 
 import hashlib
-from typing import List, Optional, Tuple
+import mmap
+import os
+import random
+import shutil
+import socket
+import struct
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from multiprocessing import Process
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # content_defined_chunks falls back to a pure-Python hash.
+    np = None
+
+DIGEST_SIZE = 32
+
+
+def _to_bytes(block: Union[str, bytes]) -> bytes:
+    """Encode a data block for hashing; bytes are used as-is."""
+    return block if isinstance(block, (bytes, bytearray, memoryview)) else block.encode()
+
+
+def _hash_level(nodes: bytes) -> bytes:
+    """
+    Hash one level of packed digests into its parent level.
+
+    Args:
+        nodes: Concatenated DIGEST_SIZE-byte digests.
+
+    Returns:
+        The parent digests; an odd last node is paired with itself.
+    """
+    sha256 = hashlib.sha256
+    pair = 2 * DIGEST_SIZE
+    parents = bytearray()
+    for start in range(0, len(nodes), pair):
+        left_right = bytes(nodes[start:start + pair])
+        if len(left_right) == DIGEST_SIZE:
+            left_right *= 2
+        parents += sha256(left_right).digest()
+    return bytes(parents)
+
+
+def _level_counts(leaf_count: int) -> List[int]:
+    """Node count of every level, leaves first, for a tree of `leaf_count` leaves."""
+    counts = [leaf_count]
+    while counts[-1] > 1:
+        counts.append((counts[-1] + 1) // 2)
+    return counts
+
+
+@dataclass
+class MultiProof:
+    """A single proof for several leaves of one tree.
+
+    Attributes:
+        leaf_count: Number of leaves in the tree (fixes the tree's shape).
+        indices: Sorted, distinct leaf indices being proven.
+        hashes: Raw sibling digests the verifier cannot derive itself, in
+            the order verify_multiproof consumes them (level by level,
+            left to right).
+    """
+
+    leaf_count: int
+    indices: List[int]
+    hashes: List[bytes]
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes of hash material in the proof."""
+        return len(self.hashes) * DIGEST_SIZE
+
+
+def _build_multiproof(node: Callable[[int, int], bytes], counts: List[int], indices: Iterable[int]) -> MultiProof:
+    """
+    Collect the sibling hashes needed to prove `indices`.
+
+    Args:
+        node: Returns the raw digest at (level, index).
+        counts: Node count per level, leaves first.
+        indices: Leaf indices to prove.
+
+    Returns:
+        The multi-proof.
+    """
+    leaves = sorted(set(indices))
+    if leaves and not (0 <= leaves[0] and leaves[-1] < counts[0]):
+        raise IndexError("leaf index out of range")
+    known = leaves
+    hashes = []
+    for k in range(len(counts) - 1):
+        known_set = set(known)
+        for i in known:
+            sibling = i ^ 1
+            if sibling < counts[k] and sibling not in known_set:
+                hashes.append(node(k, sibling))
+        known = sorted({i // 2 for i in known})
+    return MultiProof(counts[0], leaves, hashes)
+
+
+def verify_multiproof(blocks: List[Union[str, bytes]], proof: MultiProof, root_hash: str) -> bool:
+    """
+    Verify several leaves against a root with one MultiProof.
+
+    Each internal node on the union of the audit paths is hashed exactly once.
+
+    Args:
+        blocks: Data blocks for proof.indices, in the same order.
+        proof: The multi-proof.
+        root_hash: The expected hex root hash (FlatMerkleTree hashing).
+
+    Returns:
+        True if every block is authenticated by the proof.
+    """
+    if len(blocks) != len(proof.indices) or not proof.indices:
+        return False
+    sha256 = hashlib.sha256
+    level = {i: sha256(_to_bytes(block)).digest() for i, block in zip(proof.indices, blocks)}
+    supplied = iter(proof.hashes)
+    for count in _level_counts(proof.leaf_count)[:-1]:
+        parents = {}
+        for i in sorted(level):
+            parent = i // 2
+            if parent in parents:
+                continue
+            sibling = i ^ 1
+            if sibling >= count:
+                sibling_hash = level[i]
+            elif sibling in level:
+                sibling_hash = level[sibling]
+            else:
+                sibling_hash = next(supplied, None)
+                if sibling_hash is None:
+                    return False
+            pair = level[i] + sibling_hash if i % 2 == 0 else sibling_hash + level[i]
+            parents[parent] = sha256(pair).digest()
+        level = parents
+    return next(supplied, None) is None and list(level) == [0] and level[0].hex() == root_hash
+
+
+def verify_many(items: Iterable[Tuple[Union[str, bytes], List[Tuple[str, str]]]], root_hash: str) -> List[bool]:
+    """
+    Verify a batch of single-leaf proofs (FlatMerkleTree format) against one root.
+
+    The node position is recovered from each proof's directions. Nodes proven
+    by earlier proofs are remembered, so a later proof stops as soon as its
+    path reaches a node that is already known to lead to the root.
+
+    Args:
+        items: (data block, proof) pairs.
+        root_hash: The expected hex root hash.
+
+    Returns:
+        One bool per item, True if that proof is valid.
+    """
+    sha256 = hashlib.sha256
+    verified = set()
+    results = []
+    for data, proof in items:
+        current = sha256(_to_bytes(data)).digest()
+        index = sum(1 << k for k, (_, direction) in enumerate(proof) if direction == "left")
+        path = []
+        ok = None
+        for k, (sibling_hex, direction) in enumerate(proof):
+            if (k, index >> k, current) in verified:
+                ok = True
+                break
+            path.append((k, index >> k, current))
+            sibling = bytes.fromhex(sibling_hex)
+            current = sha256(sibling + current if direction == "left" else current + sibling).digest()
+        if ok is None:
+            ok = current.hex() == root_hash
+        if ok:
+            verified.update(path)
+        results.append(ok)
+    return results
+
+
+def _fanout_shift(fanout: int) -> int:
+    """Levels descended per round for a power-of-two `fanout`."""
+    if fanout < 2 or fanout & (fanout - 1):
+        raise ValueError("fanout must be a power of two >= 2")
+    return fanout.bit_length() - 1
+
+
+def _sync_start(counts_a: List[int], counts_b: List[int]) -> Tuple[int, List[int]]:
+    """
+    First level and frontier to compare between two trees.
+
+    Node i of level k covers the same leaves in both trees, so comparison
+    starts at the root level of the shorter tree, over the nodes both have.
+    """
+    level = min(len(counts_a), len(counts_b)) - 1
+    return level, list(range(min(counts_a[level], counts_b[level])))
+
+
+def _sync_expand(
+    level: int, mismatched: List[int], counts_a: List[int], counts_b: List[int], shift: int
+) -> Tuple[int, List[int]]:
+    """
+    Next level and frontier: the descendants, `shift` levels down, of the
+    mismatched nodes that exist in both trees.
+    """
+    below = max(level - shift, 0)
+    width = level - below
+    limit = min(counts_a[below], counts_b[below])
+    frontier = [
+        child
+        for i in mismatched
+        for child in range(i << width, min((i + 1) << width, limit))
+    ]
+    return below, frontier
 
 
 class MerkleNode:
@@ -224,3 +469,887 @@ class MerkleTree:
         # Filter to only valid indices
         differences = [i for i in differences if i < max_len]
         return sorted(differences)
+
+
+class FlatMerkleTree:
+    """Merkle tree stored level by level as packed raw digests.
+
+    levels[0] holds the leaf hashes and levels[-1] the single root, each a
+    bytearray of DIGEST_SIZE-byte digests; node i of a level occupies bytes
+    [32*i, 32*i + 32). An n-leaf tree costs about 64*n bytes in total and no
+    per-node Python objects.
+    """
+
+    def __init__(self, data_blocks: Iterable[Union[str, bytes]] = ()):
+        """
+        Build a Merkle tree from data blocks.
+
+        Args:
+            data_blocks: Iterable of str or bytes blocks; blocks are hashed
+                and not retained.
+        """
+        sha256 = hashlib.sha256
+        leaves = bytearray()
+        for block in data_blocks:
+            leaves += sha256(_to_bytes(block)).digest()
+        self.levels = [leaves]
+        self._build_levels()
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // DIGEST_SIZE
+
+    def _build_levels(self, start: int = 0) -> None:
+        """
+        (Re)build every level above levels[start].
+
+        Args:
+            start: The highest level that is already correct.
+        """
+        del self.levels[start + 1:]
+        nodes = self.levels[start]
+        while len(nodes) > DIGEST_SIZE:
+            nodes = bytearray(_hash_level(nodes))
+            self.levels.append(nodes)
+
+    @classmethod
+    def _from_levels(cls, levels: List[bytearray]) -> "FlatMerkleTree":
+        """
+        Wrap precomputed levels, hashing any missing levels above the last one.
+
+        Args:
+            levels: levels[0] is the leaf level; each level must be the
+                parent level of the one below it.
+
+        Returns:
+            The assembled tree.
+        """
+        tree = cls.__new__(cls)
+        tree.levels = levels
+        tree._build_levels(len(levels) - 1)
+        return tree
+
+    def _node(self, level: int, index: int) -> bytes:
+        """Return the raw digest of node `index` on `level`."""
+        start = index * DIGEST_SIZE
+        return bytes(self.levels[level][start:start + DIGEST_SIZE])
+
+    def _rehash_path(self, index: int) -> None:
+        """
+        Recompute the parents of leaf `index` up to the root, adding a level
+        when the tree grows.
+
+        Args:
+            index: The leaf whose ancestors changed.
+        """
+        sha256 = hashlib.sha256
+        levels = self.levels
+        k = 0
+        while len(levels[k]) > DIGEST_SIZE:
+            if k + 1 == len(levels):
+                levels.append(bytearray())
+            nodes = levels[k]
+            parent = index // 2
+            left_right = bytes(nodes[2 * parent * DIGEST_SIZE:(2 * parent + 2) * DIGEST_SIZE])
+            if len(left_right) == DIGEST_SIZE:
+                left_right *= 2
+            digest = sha256(left_right).digest()
+            above = levels[k + 1]
+            start = parent * DIGEST_SIZE
+            if start == len(above):
+                above += digest
+            else:
+                above[start:start + DIGEST_SIZE] = digest
+            index = parent
+            k += 1
+
+    def update(self, index: int, data: Union[str, bytes]) -> None:
+        """
+        Replace a data block, rehashing only its path to the root.
+
+        Args:
+            index: Index of the block to replace.
+            data: The new block contents.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"leaf index {index} out of range")
+        start = index * DIGEST_SIZE
+        self.levels[0][start:start + DIGEST_SIZE] = hashlib.sha256(_to_bytes(data)).digest()
+        self._rehash_path(index)
+
+    def append(self, data: Union[str, bytes]) -> None:
+        """
+        Add a data block at the end in O(log n).
+
+        Args:
+            data: The block contents.
+        """
+        self.levels[0] += hashlib.sha256(_to_bytes(data)).digest()
+        self._rehash_path(len(self) - 1)
+
+    @property
+    def root(self) -> bytes:
+        """The raw root digest (SHA-256 of the empty string for no blocks)."""
+        if not self.levels[0]:
+            return hashlib.sha256(b"").digest()
+        return bytes(self.levels[-1])
+
+    def get_root_hash(self) -> str:
+        """
+        Return the root hash of the Merkle tree.
+
+        Returns:
+            The hex-encoded root digest.
+        """
+        return self.root.hex()
+
+    def get_proof(self, index: int) -> List[Tuple[str, str]]:
+        """
+        Read the audit path for a leaf from the stored levels.
+
+        Args:
+            index: Index of the data block.
+
+        Returns:
+            A list of (hex hash, direction) tuples, leaf level first, where
+            direction says which side the sibling is on.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"leaf index {index} out of range")
+        proof = []
+        for k in range(len(self.levels) - 1):
+            count = len(self.levels[k]) // DIGEST_SIZE
+            if index % 2 == 0:
+                sibling = index + 1 if index + 1 < count else index
+                proof.append((self._node(k, sibling).hex(), "right"))
+            else:
+                proof.append((self._node(k, index - 1).hex(), "left"))
+            index //= 2
+        return proof
+
+    def get_multiproof(self, indices: Iterable[int]) -> MultiProof:
+        """
+        Build one proof covering several leaves.
+
+        Args:
+            indices: Leaf indices to prove.
+
+        Returns:
+            A MultiProof for verify_multiproof.
+        """
+        counts = [len(level) // DIGEST_SIZE for level in self.levels]
+        return _build_multiproof(self._node, counts, indices)
+
+    @staticmethod
+    def verify_proof(data: Union[str, bytes], proof: List[Tuple[str, str]], root_hash: str) -> bool:
+        """
+        Verify a proof produced by FlatMerkleTree.get_proof.
+
+        Args:
+            data: The data block to verify.
+            proof: (hex hash, direction) tuples.
+            root_hash: The expected hex root hash.
+
+        Returns:
+            True if the proof is valid, False otherwise.
+        """
+        current = hashlib.sha256(_to_bytes(data)).digest()
+        for sibling_hex, direction in proof:
+            sibling = bytes.fromhex(sibling_hex)
+            pair = sibling + current if direction == "left" else current + sibling
+            current = hashlib.sha256(pair).digest()
+        return current.hex() == root_hash
+
+    @staticmethod
+    def find_differences(tree_a: "FlatMerkleTree", tree_b: "FlatMerkleTree", fanout: int = 2) -> List[int]:
+        """
+        Find indices of data blocks that differ between two trees, skipping
+        subtrees whose hashes match.
+
+        Args:
+            tree_a: The first tree.
+            tree_b: The second tree.
+            fanout: Power-of-two fan-out of each descent step.
+
+        Returns:
+            A sorted list of differing indices, including blocks present in
+            only one tree.
+        """
+        shift = _fanout_shift(fanout)
+        counts_a = [len(level) // DIGEST_SIZE for level in tree_a.levels]
+        counts_b = [len(level) // DIGEST_SIZE for level in tree_b.levels]
+        level, frontier = _sync_start(counts_a, counts_b)
+        while True:
+            mismatched = [i for i in frontier if tree_a._node(level, i) != tree_b._node(level, i)]
+            if level == 0 or not mismatched:
+                break
+            level, frontier = _sync_expand(level, mismatched, counts_a, counts_b, shift)
+        differences = mismatched if level == 0 else []
+        return differences + list(range(min(counts_a[0], counts_b[0]), max(counts_a[0], counts_b[0])))
+
+
+def _chunk_levels(blocks: List[Union[str, bytes]], height: int) -> List[bytes]:
+    """
+    Hash one aligned chunk of leaves and `height` levels of its subtree.
+
+    A chunk that runs out of nodes early keeps pairing its last node with
+    itself, which is exactly what the full tree does to the trailing node.
+
+    Args:
+        blocks: The chunk's data blocks.
+        height: Number of levels to build above the leaves.
+
+    Returns:
+        The chunk's packed levels, leaves first.
+    """
+    sha256 = hashlib.sha256
+    level = b"".join(sha256(_to_bytes(block)).digest() for block in blocks)
+    levels = [level]
+    for _ in range(height):
+        level = _hash_level(level)
+        levels.append(level)
+    return levels
+
+
+def _file_chunk_levels(path: str, offset: int, block_size: int, num_blocks: int, height: int) -> List[bytes]:
+    """Read `num_blocks` blocks starting at `offset` and hash them like _chunk_levels."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(block_size * num_blocks)
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+    return _chunk_levels(blocks, height)
+
+
+class ParallelMerkleBuilder:
+    """Builds FlatMerkleTrees with a pool of workers.
+
+    Leaves are split into chunks of `chunk_leaves` (a power of two). Because
+    chunks are aligned, the lowest log2(chunk_leaves) levels of each chunk's
+    subtree are exactly a slice of the global levels, so workers can hash
+    them independently and the results are concatenated in order. Only the
+    roughly n / chunk_leaves nodes above that are hashed in the calling
+    process. At most 2 * max_workers chunks are in flight, so a stream of
+    blocks is never held in memory all at once.
+
+    Processes avoid the GIL entirely; threads avoid pickling and are enough
+    when blocks are large, since hashlib releases the GIL for inputs over
+    2 KiB.
+    """
+
+    def __init__(self, chunk_leaves: int = 4096, max_workers: int = None, use_threads: bool = False):
+        """
+        Configure the builder.
+
+        Args:
+            chunk_leaves: Leaves per worker task; must be a power of two.
+            max_workers: Pool size; defaults to the CPU count.
+            use_threads: Use a thread pool instead of a process pool.
+        """
+        if chunk_leaves < 1 or chunk_leaves & (chunk_leaves - 1):
+            raise ValueError("chunk_leaves must be a power of two")
+        self.chunk_leaves = chunk_leaves
+        self.height = chunk_leaves.bit_length() - 1
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_threads = use_threads
+
+    def _executor(self):
+        """Create the configured pool."""
+        pool = ThreadPoolExecutor if self.use_threads else ProcessPoolExecutor
+        return pool(max_workers=self.max_workers)
+
+    def _run(self, tasks) -> FlatMerkleTree:
+        """
+        Submit (fn, *args) tasks with a bounded window and stitch the results.
+
+        Args:
+            tasks: Iterable of (callable, args) pairs, one per chunk, in order.
+
+        Returns:
+            The assembled tree.
+        """
+        levels = [bytearray() for _ in range(self.height + 1)]
+
+        def collect(future):
+            for level, chunk_level in zip(levels, future.result()):
+                level += chunk_level
+
+        pending = deque()
+        with self._executor() as executor:
+            for fn, args in tasks:
+                pending.append(executor.submit(fn, *args))
+                if len(pending) >= 2 * self.max_workers:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+
+        # A lone partial chunk reaches its root below `height`; drop the
+        # self-paired levels it padded on above that.
+        for k, level in enumerate(levels):
+            if len(level) <= DIGEST_SIZE:
+                del levels[k + 1:]
+                break
+        return FlatMerkleTree._from_levels(levels)
+
+    def build(self, blocks: Iterable[Union[str, bytes]]) -> FlatMerkleTree:
+        """
+        Build a tree from a (possibly streaming) iterable of data blocks.
+
+        Args:
+            blocks: The data blocks, in leaf order.
+
+        Returns:
+            The tree; identical to FlatMerkleTree(blocks).
+        """
+        iterator = iter(blocks)
+
+        def tasks():
+            while True:
+                chunk = list(islice(iterator, self.chunk_leaves))
+                if not chunk:
+                    return
+                yield _chunk_levels, (chunk, self.height)
+
+        return self._run(tasks())
+
+    def build_file(self, path: str, block_size: int = 1 << 20) -> FlatMerkleTree:
+        """
+        Build a tree over a file split into fixed-size blocks.
+
+        Workers read their own byte ranges, so block data is never pickled.
+
+        Args:
+            path: The file to hash.
+            block_size: Bytes per leaf; the last block may be shorter.
+
+        Returns:
+            The tree over the file's blocks.
+        """
+        total_blocks = -(-os.path.getsize(path) // block_size)
+
+        def tasks():
+            for first in range(0, total_blocks, self.chunk_leaves):
+                count = min(self.chunk_leaves, total_blocks - first)
+                yield _file_chunk_levels, (path, first * block_size, block_size, count, self.height)
+
+        return self._run(tasks())
+
+
+def fixed_size_chunks(f: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    Split a binary stream into fixed-size chunks.
+
+    Args:
+        f: An open binary file.
+        chunk_size: Bytes per chunk; the last chunk may be shorter.
+
+    Yields:
+        Successive chunks.
+    """
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _gear_table() -> List[int]:
+    """256 pseudo-random 64-bit values for the gear rolling hash (deterministic)."""
+    return [
+        int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "little")
+        for i in range(256)
+    ]
+
+
+_GEAR = _gear_table()
+_GEAR_ARRAY = np.array(_GEAR, dtype=np.uint64) if np is not None else None
+# Bytes hashed per NumPy pass while looking for a chunk boundary.
+_GEAR_BLOCK = 64 << 10
+
+
+def _gear_boundary(data: bytes, start: int, end: int, mask: int) -> int:
+    """
+    Position just past the first byte of data[start:end] where the gear hash,
+    started at `start`, has all `mask` bits clear; `end` if there is none.
+    """
+    if np is None:
+        gear = _GEAR
+        h = 0
+        for i in range(start, end):
+            h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFFFFFFFFFF
+            if not h & mask:
+                return i + 1
+        return end
+    # h[i] = sum of gear[data[i - t]] << t, and a byte is shifted out after
+    # 64 steps, so a block only needs the 63 bytes before it as context.
+    # Each pass doubles how many trailing bytes h[i] covers.
+    for b0 in range(start, end, _GEAR_BLOCK):
+        b1 = min(b0 + _GEAR_BLOCK, end)
+        lo = max(start, b0 - 63)
+        h = _GEAR_ARRAY[np.frombuffer(data, np.uint8, b1 - lo, lo)]
+        shift = 1
+        while shift < 64:
+            h[shift:] += h[:-shift] << np.uint64(shift)
+            shift *= 2
+        hits = np.flatnonzero((h[b0 - lo:] & np.uint64(mask)) == 0)
+        if len(hits):
+            return b0 + int(hits[0]) + 1
+    return end
+
+
+def content_defined_chunks(
+    f: BinaryIO,
+    min_size: int = 256 << 10,
+    avg_size: int = 1 << 20,
+    max_size: int = 4 << 20,
+    buffer_size: int = 8 << 20,
+) -> Iterator[bytes]:
+    """
+    Split a binary stream at content-defined boundaries (gear hash, as in FastCDC).
+
+    A boundary is declared where the rolling hash has its top log2(avg_size)
+    bits clear, so an insertion only moves the boundaries near it and the
+    remaining chunks (and their leaf hashes) stay the same. The first
+    `min_size` bytes of each chunk are skipped without hashing, and with
+    NumPy the hash is computed a block at a time instead of per byte.
+
+    Args:
+        f: An open binary file.
+        min_size: Smallest chunk, except the last.
+        avg_size: Target mean chunk size (a power of two).
+        max_size: Largest chunk.
+        buffer_size: Bytes read from the stream at a time.
+
+    Yields:
+        Successive chunks.
+    """
+    mask = ((1 << (avg_size.bit_length() - 1)) - 1) << (64 - (avg_size.bit_length() - 1))
+    buf = b""
+    pos = 0
+    eof = False
+    while True:
+        if not eof and len(buf) - pos < max_size:
+            more = f.read(max(buffer_size, max_size))
+            eof = not more
+            # Keep only the unconsumed tail, so each byte is copied O(1) times.
+            buf = buf[pos:] + more
+            pos = 0
+        size = len(buf) - pos
+        if not size:
+            return
+        if size <= min_size and eof:
+            yield buf[pos:]
+            return
+        end = pos + min(size, max_size)
+        cut = _gear_boundary(buf, pos + min(min_size, end - pos), end, mask)
+        if cut == end and end - pos < max_size and not eof:
+            # No boundary yet and the buffer is short: read more first.
+            continue
+        yield buf[pos:cut]
+        pos = cut
+
+
+class DiskMerkleTree:
+    """Merkle tree whose levels live in a file and are read through mmap.
+
+    Levels file layout (little-endian): a 4 KiB header holding the magic
+    b"MKLF", format version, level count, leaf count, the offset of the
+    chunk-end table and an (offset, node count) entry per level; then each
+    level as packed raw digests, leaves first; then one uint64 per chunk
+    giving its end offset in the source file. Hashing matches
+    FlatMerkleTree, so proofs verify with FlatMerkleTree.verify_proof.
+    """
+
+    MAGIC = b"MKLF"
+    VERSION = 1
+    MAX_LEVELS = 64
+    _HEADER = struct.Struct("<4sIIQQ")
+    _LEVEL = struct.Struct("<QQ")
+    _HEADER_SIZE = 4096
+    _IO_SIZE = 1 << 20  # multiple of 2 * DIGEST_SIZE
+
+    def __init__(self, levels_path: str):
+        """
+        Open a levels file written by build().
+
+        Args:
+            levels_path: Path of the levels file.
+
+        Raises:
+            ValueError: If the file is not a levels file.
+        """
+        self.path = levels_path
+        with open(levels_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_levels, self.leaf_count, self._ends_offset = self._HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._mmap.close()
+            raise ValueError(f"{levels_path} is not a version {self.VERSION} Merkle levels file")
+        self._levels = [
+            self._LEVEL.unpack_from(self._mmap, self._HEADER.size + k * self._LEVEL.size)
+            for k in range(num_levels)
+        ]
+
+    @classmethod
+    def build(
+        cls,
+        source_path: str,
+        levels_path: str,
+        chunker: Callable[[BinaryIO], Iterable[bytes]] = fixed_size_chunks,
+    ) -> "DiskMerkleTree":
+        """
+        Chunk a file, write its Merkle levels to `levels_path` and open them.
+
+        Memory use is bounded by the chunker's buffer plus one I/O buffer,
+        independent of the file size.
+
+        Args:
+            source_path: The file to hash.
+            levels_path: Where to write the levels file.
+            chunker: Callable turning an open binary file into chunks, e.g.
+                fixed_size_chunks or content_defined_chunks (use
+                functools.partial to change their sizes).
+
+        Returns:
+            The opened DiskMerkleTree.
+        """
+        sha256 = hashlib.sha256
+        with open(levels_path, "w+b") as out, tempfile.TemporaryFile() as ends:
+            out.write(bytes(cls._HEADER_SIZE))
+            leaf_count = 0
+            position = 0
+            with open(source_path, "rb") as src:
+                for chunk in chunker(src):
+                    out.write(sha256(chunk).digest())
+                    position += len(chunk)
+                    ends.write(position.to_bytes(8, "little"))
+                    leaf_count += 1
+
+            levels = [(cls._HEADER_SIZE, leaf_count)]
+            offset, count = levels[0]
+            while count > 1:
+                out.flush()
+                parent_offset = out.tell()
+                with open(levels_path, "rb") as level_in:
+                    level_in.seek(offset)
+                    remaining = count * DIGEST_SIZE
+                    while remaining:
+                        data = level_in.read(min(cls._IO_SIZE, remaining))
+                        remaining -= len(data)
+                        out.write(_hash_level(data))
+                offset, count = parent_offset, (count + 1) // 2
+                levels.append((offset, count))
+            if len(levels) > cls.MAX_LEVELS:
+                raise ValueError("too many levels for the header")
+
+            ends_offset = out.tell()
+            ends.seek(0)
+            shutil.copyfileobj(ends, out)
+
+            out.seek(0)
+            out.write(cls._HEADER.pack(cls.MAGIC, cls.VERSION, len(levels), leaf_count, ends_offset))
+            for level in levels:
+                out.write(cls._LEVEL.pack(*level))
+        return cls(levels_path)
+
+    def __len__(self) -> int:
+        return self.leaf_count
+
+    def _node(self, level: int, index: int) -> bytes:
+        """Return the raw digest of node `index` on `level`."""
+        offset, _ = self._levels[level]
+        start = offset + index * DIGEST_SIZE
+        return self._mmap[start:start + DIGEST_SIZE]
+
+    def get_root_hash(self) -> str:
+        """
+        Return the root hash of the Merkle tree.
+
+        Returns:
+            The hex-encoded root digest.
+        """
+        if not self.leaf_count:
+            return hashlib.sha256(b"").hexdigest()
+        return self._node(len(self._levels) - 1, 0).hex()
+
+    def get_proof(self, index: int) -> List[Tuple[str, str]]:
+        """
+        Read the audit path for a chunk from the mapped levels.
+
+        Args:
+            index: Index of the chunk.
+
+        Returns:
+            A list of (hex hash, direction) tuples, leaf level first.
+        """
+        if not 0 <= index < self.leaf_count:
+            raise IndexError(f"leaf index {index} out of range")
+        proof = []
+        for k in range(len(self._levels) - 1):
+            _, count = self._levels[k]
+            if index % 2 == 0:
+                sibling = index + 1 if index + 1 < count else index
+                proof.append((self._node(k, sibling).hex(), "right"))
+            else:
+                proof.append((self._node(k, index - 1).hex(), "left"))
+            index //= 2
+        return proof
+
+    def get_multiproof(self, indices: Iterable[int]) -> MultiProof:
+        """
+        Build one proof covering several chunks.
+
+        Args:
+            indices: Chunk indices to prove.
+
+        Returns:
+            A MultiProof for verify_multiproof.
+        """
+        return _build_multiproof(self._node, [count for _, count in self._levels], indices)
+
+    def chunk_range(self, index: int) -> Tuple[int, int]:
+        """
+        Return the byte range of a chunk in the source file.
+
+        Args:
+            index: Index of the chunk.
+
+        Returns:
+            (start, end) offsets, end exclusive.
+        """
+        if not 0 <= index < self.leaf_count:
+            raise IndexError(f"leaf index {index} out of range")
+        table = self._ends_offset
+        end = int.from_bytes(self._mmap[table + 8 * index:table + 8 * index + 8], "little")
+        start = int.from_bytes(self._mmap[table + 8 * index - 8:table + 8 * index], "little") if index else 0
+        return start, end
+
+    def close(self) -> None:
+        """Unmap the levels file."""
+        self._mmap.close()
+
+    def __enter__(self) -> "DiskMerkleTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_FRAME = struct.Struct("<I")
+_HELLO = struct.Struct("<4sBQ")
+_SYNC_MAGIC = b"MKSY"
+
+
+class _Channel:
+    """Length-prefixed frames over a binary stream, with traffic counters."""
+
+    def __init__(self, stream: BinaryIO):
+        """Wrap `stream`, which must be opened for binary reading and writing."""
+        self.stream = stream
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, payload: bytes, flush: bool = True) -> None:
+        """Write one frame, flushing unless more frames follow."""
+        self.stream.write(_FRAME.pack(len(payload)))
+        self.stream.write(payload)
+        self.bytes_sent += _FRAME.size + len(payload)
+        if flush:
+            self.stream.flush()
+
+    def _read_exact(self, n: int) -> bytes:
+        """Read exactly `n` bytes or raise ConnectionError."""
+        data = self.stream.read(n)
+        if data is None or len(data) != n:
+            raise ConnectionError("stream closed during Merkle sync")
+        return data
+
+    def recv(self) -> bytes:
+        """Read one frame and return its payload."""
+        (size,) = _FRAME.unpack(self._read_exact(_FRAME.size))
+        payload = self._read_exact(size) if size else b""
+        self.bytes_received += _FRAME.size + size
+        return payload
+
+
+def _pack_bitmap(flags: List[bool]) -> bytes:
+    """Pack booleans into bytes, least significant bit first."""
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return bytes(bitmap)
+
+
+def _unpack_bitmap(bitmap: bytes, n: int) -> List[bool]:
+    """Inverse of _pack_bitmap for the first `n` flags."""
+    return [bool(bitmap[i >> 3] >> (i & 7) & 1) for i in range(n)]
+
+
+@dataclass
+class SyncResult:
+    """Outcome of sync_pull.
+
+    Attributes:
+        indices: Sorted indices of the server's blocks that differ from, or
+            are missing in, the local tree.
+        blocks: The server's blocks for `indices`, in the same order.
+        remote_leaf_count: Number of blocks on the server; local blocks at
+            or beyond it have no counterpart there.
+        bytes_sent: Bytes written by the client, framing included.
+        bytes_received: Bytes read by the client, framing included.
+        round_trips: Request/response exchanges with the server.
+    """
+
+    indices: List[int]
+    blocks: List[bytes]
+    remote_leaf_count: int
+    bytes_sent: int
+    bytes_received: int
+    round_trips: int
+
+    @property
+    def bytes_exchanged(self) -> int:
+        """Total traffic in both directions."""
+        return self.bytes_sent + self.bytes_received
+
+
+def sync_serve(stream: BinaryIO, tree: FlatMerkleTree, blocks: Sequence[Union[str, bytes]]) -> int:
+    """
+    Answer one sync_pull session from the other end of `stream`.
+
+    Args:
+        stream: Binary stream to the client (e.g. socket.makefile("rwb")).
+        tree: The server's tree.
+        blocks: The server's data blocks, indexable by leaf index.
+
+    Returns:
+        The number of blocks sent.
+
+    Raises:
+        ValueError: If the client's hello is malformed, including a
+            descent of less than one level per round.
+    """
+    channel = _Channel(stream)
+    magic, shift, remote_count = _HELLO.unpack(channel.recv())
+    if magic != _SYNC_MAGIC:
+        raise ValueError("peer is not speaking the Merkle sync protocol")
+    if shift < 1:
+        raise ValueError(f"peer requested a descent of {shift} levels per round; must be at least 1")
+    counts = [len(level) // DIGEST_SIZE for level in tree.levels]
+    remote_counts = _level_counts(remote_count)
+
+    level, frontier = _sync_start(counts, remote_counts)
+    channel.send(_FRAME.pack(counts[0]) + b"".join(tree._node(level, i) for i in frontier))
+    while True:
+        flags = _unpack_bitmap(channel.recv(), len(frontier))
+        mismatched = [i for i, flag in zip(frontier, flags) if flag]
+        if level == 0 or not mismatched:
+            break
+        level, frontier = _sync_expand(level, mismatched, counts, remote_counts, shift)
+        channel.send(b"".join(tree._node(level, i) for i in frontier))
+
+    differences = mismatched if level == 0 else []
+    differences += range(min(counts[0], remote_count), counts[0])
+    channel.send(_FRAME.pack(len(differences)), flush=False)
+    for i in differences:
+        channel.send(_to_bytes(blocks[i]), flush=False)
+    stream.flush()
+    return len(differences)
+
+
+def sync_pull(stream: BinaryIO, tree: FlatMerkleTree, fanout: int = 16) -> SyncResult:
+    """
+    Find and fetch the server's blocks that differ from the local tree.
+
+    One round trip fetches the hashes of a whole frontier, so the descent
+    takes about log_fanout(n) round trips, plus one for the hello and one
+    for the blocks; only hashes under mismatching nodes are sent.
+
+    Args:
+        stream: Binary stream to a sync_serve peer.
+        tree: The local tree.
+        fanout: Power-of-two fan-out per round; higher means fewer round
+            trips but more hashes per mismatching node.
+
+    Returns:
+        The differing blocks and traffic statistics.
+    """
+    shift = _fanout_shift(fanout)
+    channel = _Channel(stream)
+    counts = [len(level) // DIGEST_SIZE for level in tree.levels]
+    channel.send(_HELLO.pack(_SYNC_MAGIC, shift, counts[0]))
+    reply = channel.recv()
+    round_trips = 1
+    (remote_count,) = _FRAME.unpack_from(reply)
+    hashes = memoryview(reply)[_FRAME.size:]
+    remote_counts = _level_counts(remote_count)
+
+    level, frontier = _sync_start(counts, remote_counts)
+    while True:
+        if len(hashes) != len(frontier) * DIGEST_SIZE:
+            raise ValueError("unexpected hash batch from Merkle sync peer")
+        flags = [
+            tree._node(level, i) != hashes[n * DIGEST_SIZE:(n + 1) * DIGEST_SIZE]
+            for n, i in enumerate(frontier)
+        ]
+        channel.send(_pack_bitmap(flags))
+        mismatched = [i for i, flag in zip(frontier, flags) if flag]
+        if level == 0 or not mismatched:
+            break
+        level, frontier = _sync_expand(level, mismatched, counts, remote_counts, shift)
+        hashes = memoryview(channel.recv())
+        round_trips += 1
+
+    differences = mismatched if level == 0 else []
+    differences += range(min(counts[0], remote_count), remote_count)
+    (num_blocks,) = _FRAME.unpack(channel.recv())
+    round_trips += 1
+    if num_blocks != len(differences):
+        raise ValueError("Merkle sync peer sent an unexpected number of blocks")
+    received = [channel.recv() for _ in range(num_blocks)]
+    return SyncResult(differences, received, remote_count, channel.bytes_sent, channel.bytes_received, round_trips)
+
+
+def _benchmark_blocks(num_blocks: int, block_size: int, changed: Sequence[int], seed: int) -> List[bytes]:
+    """Deterministic blocks, with the blocks in `changed` altered."""
+    blocks = [hashlib.sha256(f"{seed}:{i}".encode()).digest() * (block_size // DIGEST_SIZE) for i in range(num_blocks)]
+    for i in changed:
+        blocks[i] = b"\x00" + blocks[i][1:]
+    return blocks
+
+
+def _benchmark_server(sock, num_blocks: int, block_size: int, changed: Sequence[int]) -> None:
+    """Serve one sync session over `sock` from a process of its own."""
+    blocks = _benchmark_blocks(num_blocks, block_size, changed, 0)
+    tree = FlatMerkleTree(blocks)
+    with sock, sock.makefile("rwb") as stream:
+        sync_serve(stream, tree, blocks)
+
+
+def benchmark_sync(num_blocks: int = 1 << 16, block_size: int = 4096, num_changed: int = 32) -> None:
+    """
+    Sync two processes over a socket pair and compare the traffic with
+    sending every block.
+    """
+    changed = sorted(random.Random(1).sample(range(num_blocks), num_changed))
+    local_blocks = _benchmark_blocks(num_blocks, block_size, (), 0)
+    local = FlatMerkleTree(local_blocks)
+    full_bytes = _FRAME.size * 2 + sum(_FRAME.size + len(block) for block in local_blocks)
+    print(f"{num_blocks} blocks of {block_size} B, {num_changed} changed on the server")
+    print(f"  full transfer: {full_bytes:>12,} B, 1 round trip")
+    for fanout in (2, 4, 16, 64, 256):
+        ours, theirs = socket.socketpair()
+        server = Process(target=_benchmark_server, args=(theirs, num_blocks, block_size, changed))
+        server.start()
+        theirs.close()
+        with ours, ours.makefile("rwb") as stream:
+            result = sync_pull(stream, local, fanout)
+        server.join()
+        assert result.indices == changed
+        print(
+            f"  fanout {fanout:>3}: {result.bytes_exchanged:>12,} B, "
+            f"{result.round_trips} round trips ({result.bytes_exchanged / full_bytes:.2%} of full)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_sync()
@@ -3,36 +3,453 @@ K-Nearest Neighbors Classifier - Solution
 
 A KNN classifier that supports euclidean and manhattan distance metrics.
 Uses numpy for efficient vectorized distance computation.
+
+predict works on whole batches of queries: query x train distance blocks
+are computed with one matrix product (||a||^2 + ||b||^2 - 2ab) for
+euclidean, or one vectorized pass per feature for manhattan, in blocks
+sized to fit `memory_budget`. The k nearest are selected with argpartition
+and votes are counted with one bincount per block. Ties are broken in
+favour of the class with the nearest neighbor, as Counter.most_common does
+over distance-sorted neighbors. Manhattan passes run over cache-sized
+column tiles of each block.
+
+fit can also build a KDTree (axis-aligned bounding boxes, for low
+dimensions) or a BallTree (centroid and radius, for moderate dimensions)
+over the training set. Both prune with lower bounds that hold for either
+metric, so queries return the same neighbors as brute force while visiting
+only the leaves that can still contain one of the k nearest. Queries
+descend the tree in batches and leaves are scanned with matrix products.
+algorithm="auto" picks an index from the training set's size and
+dimensionality.
+
+With n_jobs > 1, predict and score split the queries across a thread pool
+(numpy releases the GIL in its matrix products and reductions) or a
+persistent process pool. For processes, the training arrays and any tree
+index are copied into shared memory once and every worker maps them at
+start-up, so tasks only carry their slice of queries and return class codes.
+
+storage="float32" or "int8" scans a compact copy of the training set (half
+or an eighth of float64; float32 is centered on the feature means, int8
+uses per-feature affine quantization with the scales folded into the
+matrix product) and re-ranks the best
+k * rerank_factor candidates with exact distances on the array passed to
+fit. Votes can be weighted by inverse distance, and the normalized vote
+shares are returned as predict_proba from the same pass.
 """
 
+import mmap
+import os
+import time
+import weakref
+from abc import ABC, abstractmethod
 from collections import Counter
-from typing import Literal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Literal, Optional, Tuple
 
 import numpy as np
 
+# Below this many query rows per block, training columns are split instead,
+# so the matrix products stay large enough to run at BLAS speed.
+_MIN_QUERY_ROWS = 256
+# Training columns per cache-sized tile of the per-feature manhattan passes.
+_L1_TILE = 1024
+# algorithm="auto" uses a tree only for training sets at least this large
+# and at most this many features; see benchmark_algorithms for the crossover.
+_AUTO_MIN_TREE_SAMPLES = 20_000
+_AUTO_MAX_KD_FEATURES = 8
+_AUTO_MAX_BALL_FEATURES = 16
+
+
+def _row_distances(points: np.ndarray, q: np.ndarray, metric: str) -> np.ndarray:
+    """Distances from one query to each row of `points`."""
+    diff = points - q
+    if metric == "euclidean":
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    return np.abs(diff).sum(axis=1)
+
+
+def _memmap_file(array: np.ndarray) -> Optional[tuple]:
+    """
+    (filename, offset, shape, dtype, order) to reopen `array` read-only,
+    if it is a whole np.memmap of a file (or np.asarray of one), else None.
+    """
+    mapped = array if isinstance(array, np.memmap) else array.base
+    if not isinstance(mapped, np.memmap) or not isinstance(mapped.base, mmap.mmap) or mapped.filename is None:
+        return None
+    same = (
+        array.__array_interface__["data"] == mapped.__array_interface__["data"]
+        and array.shape == mapped.shape and array.dtype == mapped.dtype and array.strides == mapped.strides
+    )
+    if not same or not (array.flags.c_contiguous or array.flags.f_contiguous):
+        return None
+    order = "C" if array.flags.c_contiguous else "F"
+    return mapped.filename, mapped.offset, array.shape, array.dtype.str, order
+
+
+def _release_workers(pool: Optional[ProcessPoolExecutor], blocks: list) -> None:
+    """Stop a predict pool and unlink its shared memory blocks."""
+    if pool is not None:
+        pool.shutdown()
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+class _SpatialTree(ABC):
+    """Binary space-partitioning tree over a permuted copy of the data.
+
+    Node i covers data[start[i]:end[i]]; internal nodes have children
+    left[i] and left[i] + 1, leaves have left[i] == -1. Subclasses record
+    per-node bounding information in _record_bounds and implement
+    _lower_bounds, a lower bound on the distance from each query to any
+    point of a node. Once built, the tree is fully described by the arrays
+    named in _ARRAYS, so it can be rebuilt around shared-memory views.
+    """
+
+    _ARRAYS = ("data", "indices", "_sq_norms", "_start", "_end", "_left")
+
+    def __init__(self, X: np.ndarray, metric: str = "euclidean", leaf_size: int = 1024):
+        """
+        Build the tree.
+
+        Args:
+            X: Points of shape (n_samples, n_features).
+            metric: 'euclidean' or 'manhattan'.
+            leaf_size: Maximum number of points in a leaf.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        self.metric = metric
+        self.leaf_size = max(1, leaf_size)
+        self.indices = np.arange(len(X))
+        self._start, self._end, self._left = [], [], []
+        self._init_bounds()
+        self._build(X)
+        self.data = np.ascontiguousarray(X[self.indices])
+        self._sq_norms = np.einsum("ij,ij->i", self.data, self.data)
+        self._start, self._end, self._left = (
+            np.array(nodes, dtype=np.intp) for nodes in (self._start, self._end, self._left)
+        )
+        self._finish_bounds()
+
+    @classmethod
+    def _from_arrays(cls, arrays: dict, metric: str, leaf_size: int) -> "_SpatialTree":
+        """
+        Rebuild a tree around existing arrays without copying them.
+
+        Args:
+            arrays: The arrays named in _ARRAYS, e.g. views of shared memory.
+            metric: Metric the tree was built with.
+            leaf_size: Leaf size the tree was built with.
+
+        Returns:
+            A tree that answers queries like the one the arrays came from.
+        """
+        tree = cls.__new__(cls)
+        tree.metric = metric
+        tree.leaf_size = leaf_size
+        for name in cls._ARRAYS:
+            setattr(tree, name, arrays[name])
+        return tree
+
+    def _build(self, X: np.ndarray) -> None:
+        """Split nodes along their widest dimension at the median."""
+        self._add_node(X, 0, len(X))
+        pending = [0]
+        while pending:
+            node = pending.pop()
+            start, end = self._start[node], self._end[node]
+            if end - start <= self.leaf_size:
+                continue
+            idx = self.indices[start:end]
+            points = X[idx]
+            dim = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+            mid = (end - start) // 2
+            order = np.argpartition(points[:, dim], mid)
+            self.indices[start:end] = idx[order]
+            left = self._add_node(X, start, start + mid)
+            self._add_node(X, start + mid, end)
+            self._left[node] = left
+            pending += [left, left + 1]
+
+    def _add_node(self, X: np.ndarray, start: int, end: int) -> int:
+        """Append a leaf covering data positions [start, end) and return its id."""
+        self._start.append(start)
+        self._end.append(end)
+        self._left.append(-1)
+        self._record_bounds(X[self.indices[start:end]])
+        return len(self._start) - 1
+
+    @abstractmethod
+    def _init_bounds(self) -> None:
+        """Create the empty per-node bound lists before the build starts."""
+
+    @abstractmethod
+    def _record_bounds(self, points: np.ndarray) -> None:
+        """Append the bounds of a new node covering `points`."""
+
+    @abstractmethod
+    def _finish_bounds(self) -> None:
+        """Convert the bound lists to arrays once the build is done."""
+
+    @abstractmethod
+    def _lower_bounds(self, node: int, Q: np.ndarray) -> np.ndarray:
+        """
+        Lower bound on the distance from each query to any point of `node`.
+
+        Args:
+            node: Node id.
+            Q: Queries of shape (n_queries, n_features).
+
+        Returns:
+            Bounds of shape (n_queries,).
+        """
+
+    def _leaf_distances(self, Q: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Distances from each query to the points of data[start:end]."""
+        points = self.data[start:end]
+        if self.metric == "euclidean":
+            block = Q @ points.T
+            block *= -2.0
+            block += np.einsum("ij,ij->i", Q, Q)[:, None]
+            block += self._sq_norms[start:end]
+            return np.sqrt(np.maximum(block, 0.0, out=block), out=block)
+        block = np.abs(Q[:, 0, None] - points[:, 0])
+        for j in range(1, Q.shape[1]):
+            block += np.abs(Q[:, j, None] - points[:, j])
+        return block
+
+    def _search(
+        self, node: int, Q: np.ndarray, rows: np.ndarray, bounds: np.ndarray,
+        best_d: np.ndarray, best_i: np.ndarray, worst: np.ndarray,
+    ) -> None:
+        """
+        Visit `node` for the queries Q[rows] whose lower bound beats their
+        current k-th distance, nearer child first for each query.
+
+        best_d, best_i and worst hold each query's current k best distances,
+        their data positions and the largest of them, updated in place.
+        """
+        rows = rows[bounds < worst[rows]]
+        if not len(rows):
+            return
+        left = self._left[node]
+        if left < 0:
+            start, end = self._start[node], self._end[node]
+            k = best_d.shape[1]
+            cand_d = np.hstack([best_d[rows], self._leaf_distances(Q[rows], start, end)])
+            cand_i = np.hstack([best_i[rows], np.broadcast_to(np.arange(start, end), (len(rows), end - start))])
+            keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            best_d[rows] = np.take_along_axis(cand_d, keep, axis=1)
+            best_i[rows] = np.take_along_axis(cand_i, keep, axis=1)
+            worst[rows] = best_d[rows].max(axis=1)
+            return
+        queries = Q[rows]
+        to_left = self._lower_bounds(left, queries)
+        to_right = self._lower_bounds(left + 1, queries)
+        left_first = to_left <= to_right
+        right_first = ~left_first
+        state = (best_d, best_i, worst)
+        self._search(left, Q, rows[left_first], to_left[left_first], *state)
+        self._search(left + 1, Q, rows[right_first], to_right[right_first], *state)
+        self._search(left + 1, Q, rows[left_first], to_right[left_first], *state)
+        self._search(left, Q, rows[right_first], to_left[right_first], *state)
+
+    def query(self, X: np.ndarray, k: int, batch_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest indexed points of each query.
+
+        Queries descend the tree together: each node is visited once per
+        batch, for the queries it cannot be pruned for, so Python overhead
+        is paid per node rather than per (node, query). Safe to call from
+        several threads.
+
+        Args:
+            X: Queries of shape (n_queries, n_features).
+            k: Number of neighbors (at most the number of indexed points).
+            batch_size: Queries searched together.
+
+        Returns:
+            (distances, indices) of shape (n_queries, k), sorted by
+            increasing distance; indices refer to rows of the original X.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        distances = np.empty((len(X), k))
+        indices = np.empty((len(X), k), dtype=np.intp)
+        for q0 in range(0, len(X), batch_size):
+            Q = X[q0:q0 + batch_size]
+            best_d = np.full((len(Q), k), np.inf)
+            best_i = np.zeros((len(Q), k), dtype=np.intp)
+            worst = np.full(len(Q), np.inf)
+            self._search(0, Q, np.arange(len(Q)), self._lower_bounds(0, Q), best_d, best_i, worst)
+            order = np.argsort(best_d, axis=1, kind="stable")
+            distances[q0:q0 + len(Q)] = np.take_along_axis(best_d, order, axis=1)
+            indices[q0:q0 + len(Q)] = self.indices[np.take_along_axis(best_i, order, axis=1)]
+        return distances, indices
+
+
+class KDTree(_SpatialTree):
+    """KD-tree: each node keeps the axis-aligned bounding box of its points.
+
+    The lower bound is the distance from the query to the box under either
+    metric; it stays tight in low dimensions.
+    """
+
+    _ARRAYS = _SpatialTree._ARRAYS + ("_lo", "_hi")
+
+    def _init_bounds(self) -> None:
+        """Start empty lists of box corners."""
+        self._lo, self._hi = [], []
+
+    def _record_bounds(self, points: np.ndarray) -> None:
+        """Append the node's per-feature minimum and maximum."""
+        self._lo.append(points.min(axis=0))
+        self._hi.append(points.max(axis=0))
+
+    def _finish_bounds(self) -> None:
+        """Stack the corners into (n_nodes, n_features) arrays."""
+        self._lo, self._hi = np.array(self._lo), np.array(self._hi)
+
+    def _lower_bounds(self, node: int, Q: np.ndarray) -> np.ndarray:
+        """Distance from each query to the node's bounding box."""
+        gap = np.maximum(self._lo[node] - Q, 0.0) + np.maximum(Q - self._hi[node], 0.0)
+        if self.metric == "euclidean":
+            return np.sqrt(np.einsum("ij,ij->i", gap, gap))
+        return gap.sum(axis=1)
+
+
+class BallTree(_SpatialTree):
+    """Ball tree: each node keeps its centroid and covering radius.
+
+    The radius is measured in the tree's metric, so by the triangle
+    inequality no point of a node is nearer than dist(q, centroid) - radius.
+    Balls adapt to the data better than boxes as dimensionality grows.
+    """
+
+    _ARRAYS = _SpatialTree._ARRAYS + ("_centers", "_radii")
+
+    def _init_bounds(self) -> None:
+        """Start empty lists of centroids and radii."""
+        self._centers, self._radii = [], []
+
+    def _record_bounds(self, points: np.ndarray) -> None:
+        """Append the node's centroid and the distance to its farthest point."""
+        center = points.mean(axis=0)
+        self._centers.append(center)
+        self._radii.append(_row_distances(points, center, self.metric).max())
+
+    def _finish_bounds(self) -> None:
+        """Stack the centroids and radii into arrays."""
+        self._centers, self._radii = np.array(self._centers), np.array(self._radii)
+
+    def _lower_bounds(self, node: int, Q: np.ndarray) -> np.ndarray:
+        """Distance from each query to the centroid, less the radius, floored at 0."""
+        distance = _row_distances(Q, self._centers[node], self.metric)
+        return np.maximum(distance - self._radii[node], 0.0)
+
+
+_TREES = {"kd_tree": KDTree, "ball_tree": BallTree}
+
 
 class KNNClassifier:
-    def __init__(self, k: int = 3, distance_metric: Literal["euclidean", "manhattan"] = "euclidean"):
+    def __init__(
+        self,
+        k: int = 3,
+        distance_metric: Literal["euclidean", "manhattan"] = "euclidean",
+        memory_budget: int = 256 << 20,
+        algorithm: Literal["auto", "brute", "kd_tree", "ball_tree"] = "brute",
+        leaf_size: int = 1024,
+        n_jobs: int = 1,
+        backend: Literal["threads", "processes"] = "threads",
+        storage: Literal["float64", "float32", "int8"] = "float64",
+        weights: Literal["uniform", "distance"] = "uniform",
+        rerank_factor: int = 4,
+    ):
         """
         Initialize the KNN classifier.
 
         Args:
             k: Number of nearest neighbors to use for prediction.
             distance_metric: Distance metric to use ('euclidean' or 'manhattan').
+            memory_budget: Approximate bytes of scratch memory for each
+                distance block computed by predict.
+            algorithm: Neighbor search: 'brute', 'kd_tree', 'ball_tree', or
+                'auto' to choose one when fit sees the data.
+            leaf_size: Maximum points per tree leaf. Leaves are scanned
+                with one matrix product per batch of queries, so large
+                leaves are cheaper than deep trees.
+            n_jobs: Workers used by predict and score; -1 means one per CPU.
+            backend: 'threads' or 'processes' for n_jobs > 1. Processes
+                read the training data from shared memory and stay alive
+                until close() or the next fit.
+            storage: dtype of the scanned training copy: 'float64',
+                'float32', or 'int8' (per-feature affine quantization).
+                Compact storage requires algorithm 'brute' or 'auto'.
+            weights: 'uniform' votes, or 'distance' to weight each
+                neighbor by 1 / distance.
+            rerank_factor: With compact storage, k * rerank_factor
+                candidates are found in the compact copy and re-ranked
+                with exact distances on the array passed to fit; 0 keeps
+                only the compact copy and returns approximate distances.
 
         Raises:
-            ValueError: If an unsupported distance metric is provided.
+            ValueError: If an unsupported distance metric, algorithm,
+                storage or weighting is provided.
         """
         if distance_metric not in ("euclidean", "manhattan"):
             raise ValueError(f"Unsupported distance metric: {distance_metric}. Use 'euclidean' or 'manhattan'.")
+        if backend not in ("threads", "processes"):
+            raise ValueError(f"Unsupported backend: {backend}. Use 'threads' or 'processes'.")
+        if algorithm not in ("auto", "brute", "kd_tree", "ball_tree"):
+            raise ValueError(
+                f"Unsupported algorithm: {algorithm}. Use 'auto', 'brute', 'kd_tree' or 'ball_tree'."
+            )
+        if storage not in ("float64", "float32", "int8"):
+            raise ValueError(f"Unsupported storage: {storage}. Use 'float64', 'float32' or 'int8'.")
+        if storage != "float64" and algorithm not in ("auto", "brute"):
+            raise ValueError(f"storage={storage!r} is only supported with algorithm 'brute' or 'auto'.")
+        if weights not in ("uniform", "distance"):
+            raise ValueError(f"Unsupported weights: {weights}. Use 'uniform' or 'distance'.")
         self.k = k
         self.distance_metric = distance_metric
+        self.memory_budget = memory_budget
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.storage = storage
+        self.weights = weights
+        self.rerank_factor = rerank_factor
         self.X_train = None
         self.y_train = None
+        self.classes_ = None
+        self._y_codes = None
+        self._train_sq_norms = None
+        self._exact = None
+        self._scan_offset = None
+        self._scan_scale = None
+        self._index = None
+        self.algorithm_ = None
+        self._pool = None
+        self._finalizer = None
+
+    def _choose_algorithm(self, n_samples: int, n_features: int) -> str:
+        """Resolve algorithm='auto' for a training set of the given shape."""
+        if self.algorithm != "auto":
+            return self.algorithm
+        if self.storage != "float64":
+            return "brute"
+        if n_samples < _AUTO_MIN_TREE_SAMPLES or n_features > _AUTO_MAX_BALL_FEATURES:
+            return "brute"
+        return "kd_tree" if n_features <= _AUTO_MAX_KD_FEATURES else "ball_tree"
 
     def fit(self, X: np.ndarray, y: np.ndarray) -> "KNNClassifier":
         """
-        Store the training data.
+        Store the training data and build the neighbor index, if any.
+
+        With compact storage the array passed in is kept by reference (not
+        copied) for re-ranking, so passing an np.memmap leaves the
+        full-precision vectors on disk.
 
         Args:
             X: Training feature matrix of shape (n_samples, n_features).
@@ -41,10 +458,63 @@ class KNNClassifier:
         Returns:
             self
         """
-        self.X_train = np.array(X)
+        self.close()
         self.y_train = np.array(y)
+        self.classes_, self._y_codes = np.unique(self.y_train, return_inverse=True)
+        self._scan_offset = self._scan_scale = None
+        if self.storage == "float64":
+            self.X_train = self._exact = np.ascontiguousarray(X, dtype=np.float64)
+            self._train_sq_norms = np.einsum("ij,ij->i", self.X_train, self.X_train)
+        else:
+            exact = np.asarray(X, dtype=np.float64)
+            self._exact = exact if self.rerank_factor > 0 else None
+            self._compress(exact)
+        self.algorithm_ = self._choose_algorithm(*self.X_train.shape)
+        if self.algorithm_ == "brute":
+            self._index = None
+        else:
+            self._index = _TREES[self.algorithm_](self.X_train, self.distance_metric, self.leaf_size)
         return self
 
+    def _compress(self, X: np.ndarray) -> None:
+        """
+        Build the compact scanned copy of X and its (weighted) squared norms,
+        a bounded number of rows at a time.
+        """
+        n, d = X.shape
+        if self.storage == "int8":
+            # x ~= offset + scale * (code + 128), codes in [-128, 127].
+            lo, hi = X.min(axis=0), X.max(axis=0)
+            scale = (hi - lo) / 255.0
+            scale[scale == 0] = 1.0
+            self._scan_offset, self._scan_scale = lo, scale
+            weight = scale ** 2 if self.distance_metric == "euclidean" else scale
+        else:
+            # x = offset + centered; centering keeps ||a||^2 + ||b||^2 - 2ab
+            # accurate in float32 when the data sits far from the origin.
+            self._scan_offset = X.mean(axis=0)
+        self.X_train = np.empty((n, d), dtype=np.int8 if self.storage == "int8" else np.float32)
+        self._train_sq_norms = np.empty(n)
+        step = max(1, (16 << 20) // max(8 * d, 1))
+        for start in range(0, n, step):
+            rows = X[start:start + step]
+            if self.storage == "int8":
+                codes = np.rint((rows - lo) / scale) - 128.0
+                self.X_train[start:start + step] = codes
+                self._train_sq_norms[start:start + step] = (codes * codes) @ weight
+            else:
+                self.X_train[start:start + step] = rows - self._scan_offset
+                compact = self.X_train[start:start + step].astype(np.float64)
+                self._train_sq_norms[start:start + step] = np.einsum("ij,ij->i", compact, compact)
+
+    def _full_precision(self) -> np.ndarray:
+        """The exact training vectors, or the dequantized compact copy."""
+        if self._exact is not None:
+            return self._exact
+        if self._scan_scale is not None:
+            return self._scan_offset + self._scan_scale * (self.X_train + 128.0)
+        return self._scan_offset + self.X_train
+
     def _compute_distances(self, x: np.ndarray) -> np.ndarray:
         """
         Compute distances from a single point to all training points.
@@ -55,10 +525,11 @@ class KNNClassifier:
         Returns:
             Array of distances of shape (n_train_samples,).
         """
+        X_train = self._full_precision()
         if self.distance_metric == "euclidean":
-            return np.sqrt(np.sum((self.X_train - x) ** 2, axis=1))
+            return np.sqrt(np.sum((X_train - x) ** 2, axis=1))
         else:  # manhattan
-            return np.sum(np.abs(self.X_train - x), axis=1)
+            return np.sum(np.abs(X_train - x), axis=1)
 
     def _predict_single(self, x: np.ndarray):
         """
@@ -71,23 +542,291 @@ class KNNClassifier:
             The predicted class label.
         """
         distances = self._compute_distances(x)
-        nearest_indices = np.argsort(distances)[: self.k]
+        nearest_indices = np.argsort(distances, kind="stable")[: self.k]
         nearest_labels = self.y_train[nearest_indices]
         counter = Counter(nearest_labels)
         return counter.most_common(1)[0][0]
 
-    def predict(self, X: np.ndarray) -> np.ndarray:
+    def _block_shape(self, n_queries: int, k: int) -> Tuple[int, int]:
+        """
+        Pick (query rows, training columns) per distance block so that the
+        block and its temporaries fit in memory_budget.
+        """
+        n_train, n_features = self.X_train.shape
+        # A distance block plus one temporary of the same size, and for int8
+        # storage the float32 copy of the block's training rows.
+        itemsize = 8 if self.storage == "float64" else 4
+        column_bytes = 4 * n_features if self.storage == "int8" else 0
+        rows = (self.memory_budget // n_train - column_bytes) // (2 * itemsize)
+        rows = min(n_queries, max(1, rows))
+        if rows >= min(n_queries, _MIN_QUERY_ROWS):
+            return rows, n_train
+        rows = min(n_queries, _MIN_QUERY_ROWS)
+        cols = self.memory_budget // (2 * itemsize * rows + column_bytes)
+        return rows, min(n_train, max(k, cols))
+
+    def _scan_queries(self, Q: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Map float64 queries into the compact copy's coordinates.
+
+        Returns:
+            (queries, weighted queries for the euclidean matrix product,
+            weighted squared norms).
+        """
+        if self.storage == "float64":
+            return Q, Q, np.einsum("ij,ij->i", Q, Q)
+        if self._scan_scale is None:
+            Qc = Q - self._scan_offset
+            Qs = Qc.astype(np.float32)
+            return Qs, Qs, np.einsum("ij,ij->i", Qc, Qc)
+        Qc = (Q - self._scan_offset) / self._scan_scale - 128.0
+        weight = self._scan_scale ** 2
+        Qw = Qc * weight
+        return Qc.astype(np.float32), Qw.astype(np.float32), np.einsum("ij,ij->i", Qc, Qw)
+
+    def _distance_block(
+        self, Q: np.ndarray, Qw: np.ndarray, q_sq_norms: np.ndarray, start: int, stop: int
+    ) -> np.ndarray:
+        """
+        Distances (squared for euclidean) from each query to training rows
+        [start, stop), in the compact copy's precision.
+        """
+        X = self.X_train[start:stop]
+        if X.dtype == np.int8:
+            X = X.astype(np.float32)
+        if self.distance_metric == "euclidean":
+            block = Qw @ X.T
+            block *= -2.0
+            block += q_sq_norms[:, None]
+            block += self._train_sq_norms[start:stop]
+            np.maximum(block, 0.0, out=block)
+            return block
+        block = np.zeros((len(Q), len(X)), dtype=Q.dtype)
+        scratch = np.empty((len(Q), min(len(X), _L1_TILE)), dtype=Q.dtype)
+        scale = self._scan_scale
+        for c0 in range(0, len(X), _L1_TILE):
+            tile = block[:, c0:c0 + _L1_TILE]
+            tmp = scratch[:, :tile.shape[1]]
+            for j in range(Q.shape[1]):
+                np.subtract(Q[:, j, None], X[c0:c0 + _L1_TILE, j], out=tmp)
+                np.abs(tmp, out=tmp)
+                if scale is not None:
+                    tmp *= scale[j]
+                tile += tmp
+        return block
+
+    def _rerank(self, Q: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact distances to each query's candidates, keeping the k nearest,
+        sorted. Reads only the candidate rows of the full-precision data.
+        """
+        distances = np.empty((len(Q), k))
+        indices = np.empty((len(Q), k), dtype=np.intp)
+        step = max(1, self.memory_budget // (16 * candidates.shape[1] * Q.shape[1]))
+        for r0 in range(0, len(Q), step):
+            cand = candidates[r0:r0 + step]
+            diff = self._exact[cand.ravel()].reshape(cand.shape + (Q.shape[1],))
+            diff -= Q[r0:r0 + step, None, :]
+            if self.distance_metric == "euclidean":
+                exact = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+            else:
+                exact = np.abs(diff, out=diff).sum(axis=2)
+            order = np.argsort(exact, axis=1, kind="stable")[:, :k]
+            distances[r0:r0 + step] = np.take_along_axis(exact, order, axis=1)
+            indices[r0:r0 + step] = np.take_along_axis(cand, order, axis=1)
+        return distances, indices
+
+    def kneighbors(self, X: np.ndarray, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest training points of each query.
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features).
+            k: Number of neighbors (defaults to self.k, capped at the
+                training set size).
+
+        Returns:
+            (distances, indices), each of shape (n_samples, k), sorted by
+            increasing distance.
+        """
+        Q = np.ascontiguousarray(X, dtype=np.float64)
+        n_train = len(self._y_codes)
+        k = min(self.k if k is None else k, n_train)
+        if self._index is not None:
+            return self._index.query(Q, k)
+        rerank = self.storage != "float64" and self._exact is not None
+        n_cand = min(n_train, k * self.rerank_factor) if rerank else k
+        rows, cols = self._block_shape(len(Q), n_cand)
+        Qs, Qw, q_sq_norms = self._scan_queries(Q)
+        distances = np.empty((len(Q), k))
+        indices = np.empty((len(Q), k), dtype=np.intp)
+
+        for q0 in range(0, len(Q), rows):
+            q1 = min(q0 + rows, len(Q))
+            best_d = best_i = None
+            for t0 in range(0, n_train, cols):
+                t1 = min(t0 + cols, n_train)
+                block = self._distance_block(Qs[q0:q1], Qw[q0:q1], q_sq_norms[q0:q1], t0, t1)
+                if t1 - t0 > n_cand:
+                    part = np.argpartition(block, n_cand - 1, axis=1)[:, :n_cand]
+                else:
+                    part = np.broadcast_to(np.arange(t1 - t0), block.shape)
+                cand_d = np.take_along_axis(block, part, axis=1)
+                cand_i = part + t0
+                if best_d is not None:
+                    cand_d = np.hstack([best_d, cand_d])
+                    cand_i = np.hstack([best_i, cand_i])
+                    part = np.argpartition(cand_d, n_cand - 1, axis=1)[:, :n_cand]
+                    cand_d = np.take_along_axis(cand_d, part, axis=1)
+                    cand_i = np.take_along_axis(cand_i, part, axis=1)
+                best_d, best_i = cand_d, cand_i
+            if rerank:
+                distances[q0:q1], indices[q0:q1] = self._rerank(Q[q0:q1], best_i, k)
+                continue
+            order = np.argsort(best_d, axis=1, kind="stable")
+            distances[q0:q1] = np.take_along_axis(best_d, order, axis=1)
+            indices[q0:q1] = np.take_along_axis(best_i, order, axis=1)
+            if self.distance_metric == "euclidean":
+                np.sqrt(distances[q0:q1], out=distances[q0:q1])
+        return distances, indices
+
+    def _vote(self, distances: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weighted vote over distance-sorted neighbors; ties go to the class
+        whose first neighbor is nearest.
+
+        With distance weights, a query that coincides with training points
+        gets its votes from those points only.
+
+        Returns:
+            (winning class codes of shape (n_samples,), class
+            probabilities of shape (n_samples, n_classes)).
+        """
+        n, k = indices.shape
+        n_classes = len(self.classes_)
+        codes = self._y_codes[indices]
+        rows = np.arange(n)[:, None]
+        if self.weights == "uniform":
+            weight = None
+        else:
+            with np.errstate(divide="ignore"):
+                weight = 1.0 / distances
+            exact = distances == 0
+            hit = exact.any(axis=1)
+            weight[hit] = exact[hit]
+            weight = weight.ravel()
+        scores = np.bincount((rows * n_classes + codes).ravel(), weight, minlength=n * n_classes)
+        scores = scores.reshape(n, n_classes).astype(np.float64)
+        first = np.full((n, n_classes), k)
+        for rank in range(k - 1, -1, -1):
+            first[rows[:, 0], codes[:, rank]] = rank
+        tied = scores == scores.max(axis=1, keepdims=True)
+        winners = np.where(tied, first, k + 1).argmin(axis=1)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return winners, scores
+
+    def _predict_codes(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Class codes and probabilities for X, computed in this thread."""
+        # Keep the (n_samples, k) neighbor arrays bounded too.
+        step = max(1, self.memory_budget // (64 * max(self.k, 1)))
+        votes = [self._vote(*self.kneighbors(X[i:i + step])) for i in range(0, len(X), step)]
+        return np.concatenate([c for c, _ in votes]), np.vstack([p for _, p in votes])
+
+    def _workers(self) -> int:
+        if self.n_jobs == -1:
+            return os.cpu_count() or 1
+        return max(1, self.n_jobs)
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        """
+        Start the worker processes on first use, publishing the arrays they
+        search in shared memory: the tree index if there is one, else the
+        scanned training matrix. A memmapped re-ranking matrix is reopened
+        from its file rather than copied.
+        """
+        if self._pool is None:
+            if self._index is not None:
+                arrays = {f"_index.{name}": getattr(self._index, name) for name in self._index._ARRAYS}
+            else:
+                names = ["X_train", "_train_sq_norms", "_scan_offset", "_scan_scale"]
+                arrays = {name: getattr(self, name) for name in names}
+            arrays["_y_codes"] = self._y_codes
+            files = {}
+            if self._exact is not None and self._exact is not self.X_train:
+                source = _memmap_file(self._exact)
+                if source is None:
+                    arrays["_exact"] = self._exact
+                else:
+                    files["_exact"] = source
+            layout, blocks = {}, []
+            try:
+                for name, array in arrays.items():
+                    if array is None:
+                        continue
+                    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                    blocks.append(shm)
+                    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+                    layout[name] = (shm.name, array.shape, array.dtype.str)
+            except BaseException:
+                _release_workers(None, blocks)
+                raise
+            params = (
+                self.k, self.distance_metric, self.memory_budget, self.storage, self.weights,
+                self.rerank_factor, self.algorithm_, self.leaf_size, len(self.classes_),
+            )
+            self._pool = ProcessPoolExecutor(
+                self._workers(), initializer=_init_worker, initargs=(layout, files, params)
+            )
+            # Unlinks the blocks even if the classifier is never closed.
+            self._finalizer = weakref.finalize(self, _release_workers, self._pool, blocks)
+        return self._pool
+
+    def predict(self, X: np.ndarray, return_proba: bool = False):
         """
         Predict class labels for a set of samples.
 
+        Args:
+            X: Feature matrix of shape (n_samples, n_features).
+            return_proba: Also return the class probabilities, which come
+                out of the same vote.
+
+        Returns:
+            Predicted labels of shape (n_samples,), or (labels,
+            probabilities of shape (n_samples, n_classes)) with
+            return_proba.
+        """
+        X = np.asarray(X)
+        if len(X) == 0:
+            codes, proba = np.empty(0, dtype=np.intp), np.empty((0, len(self.classes_)))
+        elif self._workers() == 1 or len(X) < 2 * self._workers():
+            codes, proba = self._predict_codes(X)
+        else:
+            workers = self._workers()
+            # A few tasks per worker evens out uneven tree searches.
+            parts = np.array_split(X, min(len(X), 4 * workers))
+            if self.backend == "threads":
+                with ThreadPoolExecutor(workers) as pool:
+                    results = list(pool.map(self._predict_codes, parts))
+            else:
+                results = list(self._process_pool().map(_worker_predict_codes, parts))
+            codes = np.concatenate([c for c, _ in results])
+            proba = np.vstack([p for _, p in results])
+        labels = self.classes_[codes]
+        return (labels, proba) if return_proba else labels
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Estimate class probabilities as the (weighted) share of each class
+        among the k nearest neighbors.
+
         Args:
             X: Feature matrix of shape (n_samples, n_features).
 
         Returns:
-            Predicted labels of shape (n_samples,).
+            Probabilities of shape (n_samples, n_classes), columns ordered
+            as classes_.
         """
-        X = np.array(X)
-        return np.array([self._predict_single(x) for x in X])
+        return self.predict(X, return_proba=True)[1]
 
     def score(self, X: np.ndarray, y: np.ndarray) -> float:
         """
@@ -102,3 +841,192 @@ class KNNClassifier:
         """
         predictions = self.predict(X)
         return float(np.mean(predictions == np.array(y)))
+
+    def close(self) -> None:
+        """Stop the worker processes and free the shared training arrays."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._pool = self._finalizer = None
+
+    def __enter__(self) -> "KNNClassifier":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Per-process state of the predict workers: a KNNClassifier whose training
+# arrays and tree index are views of the parent's shared memory.
+_worker_model = None
+_worker_blocks = []
+
+
+def _init_worker(layout: dict, files: dict, params: tuple) -> None:
+    """Map the shared (or memmapped) training arrays and build this worker's model."""
+    global _worker_model
+    k, metric, memory_budget, storage, weights, rerank_factor, algorithm, leaf_size, n_classes = params
+    model = KNNClassifier(k, metric, memory_budget, storage=storage, weights=weights, rerank_factor=rerank_factor)
+    # Workers return class codes; the parent maps them to labels.
+    model.classes_ = np.arange(n_classes)
+    tree_arrays = {}
+    for name, (shm_name, shape, dtype) in layout.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker_blocks.append(shm)
+        view = np.ndarray(shape, dtype, buffer=shm.buf)
+        if name.startswith("_index."):
+            tree_arrays[name[len("_index."):]] = view
+        else:
+            setattr(model, name, view)
+    for name, (filename, offset, shape, dtype, order) in files.items():
+        setattr(model, name, np.memmap(filename, dtype, mode="r", offset=offset, shape=shape, order=order))
+    if storage == "float64":
+        model._exact = model.X_train
+    if algorithm in _TREES:
+        model._index = _TREES[algorithm]._from_arrays(tree_arrays, metric, leaf_size)
+    _worker_model = model
+
+
+def _worker_predict_codes(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return _worker_model._predict_codes(X)
+
+
+def benchmark_predict(n_train: int = 100_000, n_queries: int = 2_000, n_features: int = 32, k: int = 5) -> None:
+    """
+    Compare per-row prediction (_predict_single) with the batched engine.
+
+    Args:
+        n_train: Training set size.
+        n_queries: Number of queries.
+        n_features: Dimensionality.
+        k: Number of neighbors.
+    """
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_train, n_features))
+    y = rng.integers(0, 10, n_train)
+    Q = rng.standard_normal((n_queries, n_features))
+    print(f"{n_queries} queries x {n_train} training points, {n_features} features, k={k}")
+    for metric in ("euclidean", "manhattan"):
+        knn = KNNClassifier(k, metric).fit(X, y)
+        sample = Q[:max(1, n_queries // 20)]
+        start = time.perf_counter()
+        looped = np.array([knn._predict_single(x) for x in sample])
+        per_row = (time.perf_counter() - start) / len(sample)
+        start = time.perf_counter()
+        batched = knn.predict(Q)
+        per_row_batched = (time.perf_counter() - start) / n_queries
+        agree = np.mean(batched[:len(sample)] == looped)
+        print(
+            f"  {metric:<9}  per-row {per_row * 1e6:9.1f} us/query  "
+            f"batched {per_row_batched * 1e6:9.1f} us/query  "
+            f"({per_row / per_row_batched:.1f}x, {agree:.0%} agreement)"
+        )
+
+
+def benchmark_algorithms(
+    sizes: Tuple[int, ...] = (2_000, 20_000, 200_000),
+    dims: Tuple[int, ...] = (2, 8, 16, 32),
+    n_queries: int = 1_000,
+    k: int = 5,
+) -> None:
+    """
+    Time brute force against the KD-tree and ball tree per query, on
+    uniform and clustered data of several sizes and dimensionalities, and
+    show what algorithm="auto" picks.
+
+    Args:
+        sizes: Training set sizes.
+        dims: Feature counts.
+        n_queries: Queries per measurement.
+        k: Number of neighbors.
+    """
+    rng = np.random.default_rng(0)
+    print(f"us/query, k={k}, {n_queries} queries (fit time excluded)")
+    print(f"{'data':>9} {'n_train':>8} {'dims':>4} {'brute':>10} {'kd_tree':>10} {'ball_tree':>10}  auto")
+    for data in ("uniform", "clustered"):
+        for n_train in sizes:
+            for n_features in dims:
+                if data == "uniform":
+                    X = rng.random((n_train, n_features))
+                    Q = rng.random((n_queries, n_features))
+                else:
+                    centers = rng.standard_normal((32, n_features)) * 5
+                    X = centers[rng.integers(0, 32, n_train)] + rng.standard_normal((n_train, n_features))
+                    Q = centers[rng.integers(0, 32, n_queries)] + rng.standard_normal((n_queries, n_features))
+                y = rng.integers(0, 3, n_train)
+                timings = []
+                for algorithm in ("brute", "kd_tree", "ball_tree"):
+                    knn = KNNClassifier(k, algorithm=algorithm).fit(X, y)
+                    start = time.perf_counter()
+                    knn.kneighbors(Q)
+                    timings.append((time.perf_counter() - start) / n_queries * 1e6)
+                auto = KNNClassifier(k, algorithm="auto")._choose_algorithm(n_train, n_features)
+                print(
+                    f"{data:>9} {n_train:>8} {n_features:>4} "
+                    + " ".join(f"{t:>10.1f}" for t in timings)
+                    + f"  {auto}"
+                )
+
+
+def benchmark_parallel(n_train: int = 200_000, n_queries: int = 20_000, n_features: int = 32, k: int = 5) -> None:
+    """
+    Time score() with 1 to cpu_count() workers for both backends.
+
+    Args:
+        n_train: Training set size.
+        n_queries: Number of scored queries.
+        n_features: Dimensionality.
+        k: Number of neighbors.
+    """
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_train, n_features))
+    y = rng.integers(0, 10, n_train)
+    Q = rng.standard_normal((n_queries, n_features))
+    y_q = rng.integers(0, 10, n_queries)
+    cpus = os.cpu_count() or 1
+    print(f"score: {n_queries} queries x {n_train} training points, {n_features} features, {cpus} CPUs")
+    jobs = sorted({1, 2, cpus // 2, cpus} - {0})
+    for backend in ("threads", "processes"):
+        for n_jobs in jobs:
+            with KNNClassifier(k, n_jobs=n_jobs, backend=backend).fit(X, y) as knn:
+                knn.score(Q[:2 * n_jobs], y_q[:2 * n_jobs])  # start the pool
+                start = time.perf_counter()
+                knn.score(Q, y_q)
+                elapsed = time.perf_counter() - start
+            print(f"  {backend:<9} n_jobs={n_jobs:<3} {elapsed:7.2f} s")
+
+
+def benchmark_storage(n_train: int = 200_000, n_queries: int = 2_000, n_features: int = 64, k: int = 10) -> None:
+    """
+    Compare scanned bytes, query time and neighbor recall of float64,
+    float32 and int8 storage, with and without exact re-ranking.
+
+    Args:
+        n_train: Training set size.
+        n_queries: Number of queries.
+        n_features: Dimensionality.
+        k: Number of neighbors.
+    """
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_train, n_features))
+    y = rng.integers(0, 10, n_train)
+    Q = X[rng.integers(0, n_train, n_queries)] + 0.5 * rng.standard_normal((n_queries, n_features))
+    reference = KNNClassifier(k).fit(X, y)
+    _, truth = reference.kneighbors(Q)
+    print(f"{n_queries} queries x {n_train} training points, {n_features} features, k={k}")
+    for storage, rerank_factor in (("float64", 0), ("float32", 0), ("float32", 4), ("int8", 0), ("int8", 4)):
+        knn = KNNClassifier(k, storage=storage, rerank_factor=rerank_factor).fit(X, y)
+        start = time.perf_counter()
+        _, found = knn.kneighbors(Q)
+        elapsed = time.perf_counter() - start
+        recall = np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(found, truth)])
+        print(
+            f"  {storage:<7} rerank x{rerank_factor}  {knn.X_train.nbytes / 2**20:7.1f} MiB scanned  "
+            f"{elapsed / n_queries * 1e6:8.1f} us/query  recall {recall:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_predict()
+    benchmark_algorithms()
+    benchmark_parallel()
+    benchmark_storage()
@@ -4,20 +4,259 @@ Mini-Batch Gradient Descent - Solution
 Implements mini-batch stochastic gradient descent for linear regression.
 Partitions data into shuffled mini-batches, computes gradients per batch,
 updates weights, and tracks MSE loss each epoch.
+
+Training streams: batches are cut lazily from a shuffled order, so X and y
+may be np.memmap arrays larger than RAM. Shuffling then permutes blocks of
+contiguous rows (each read with one sequential access) and the rows within
+each block. fit_batches trains from any re-iterable source of batches. The
+epoch loss is either an exact pass over the data or, between full
+evaluations, the running mean of each batch's squared error measured just
+before its update.
+
+Updates go through a pluggable Optimizer (SGD, Momentum, Nesterov,
+AdaGrad, Adam) acting in place on one packed parameter vector [w..., b],
+with an optional per-epoch learning-rate schedule and L1/L2 penalties on w.
+All gradient, residual and optimizer buffers are allocated once per fit.
+With a validation set, training can stop once the validation loss has not
+improved for `patience` epochs and restore the best weights seen.
 """
 
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Union
+
 import numpy as np
 
+# Rows per block when shuffling np.memmap inputs and per chunk of a full
+# loss evaluation are sized to about this many bytes.
+_BLOCK_BYTES = 64 << 20
+
+
+class Optimizer(ABC):
+    """Update rule applied in place to the packed parameters [w..., b].
+
+    reset() allocates every buffer the rule needs once per fit, so step()
+    makes no allocations.
+    """
+
+    def reset(self, size: int) -> None:
+        """Allocate state for `size` parameters and clear it."""
+        self._scratch = np.empty(size)
+
+    @abstractmethod
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Update `theta` in place from the gradient `grad` with step size `lr`."""
+
+
+class SGD(Optimizer):
+    """Plain gradient step: theta -= lr * grad."""
+
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Take one plain gradient step in place."""
+        np.multiply(grad, lr, out=self._scratch)
+        theta -= self._scratch
+
+
+class Momentum(Optimizer):
+    """Heavy-ball momentum: v = beta * v + grad; theta -= lr * v."""
+
+    def __init__(self, beta: float = 0.9):
+        """
+        Args:
+            beta: Decay of the velocity per step.
+        """
+        self.beta = beta
+
+    def reset(self, size: int) -> None:
+        """Allocate the scratch buffer and a zero velocity."""
+        super().reset(size)
+        self._velocity = np.zeros(size)
+
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Fold `grad` into the velocity and step along it in place."""
+        self._velocity *= self.beta
+        self._velocity += grad
+        np.multiply(self._velocity, lr, out=self._scratch)
+        theta -= self._scratch
+
+
+class Nesterov(Momentum):
+    """Nesterov momentum: v = beta * v + grad; theta -= lr * (grad + beta * v)."""
+
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Fold `grad` into the velocity and step from the look-ahead point in place."""
+        self._velocity *= self.beta
+        self._velocity += grad
+        np.multiply(self._velocity, self.beta, out=self._scratch)
+        self._scratch += grad
+        self._scratch *= lr
+        theta -= self._scratch
+
+
+class AdaGrad(Optimizer):
+    """Per-parameter steps scaled by the root of the summed squared gradients."""
+
+    def __init__(self, eps: float = 1e-8):
+        """
+        Args:
+            eps: Added to the root before dividing, for numerical stability.
+        """
+        self.eps = eps
+
+    def reset(self, size: int) -> None:
+        """Allocate the scratch buffer and a zero sum of squared gradients."""
+        super().reset(size)
+        self._sum_sq = np.zeros(size)
+
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Accumulate the squared gradient and take a per-parameter scaled step in place."""
+        scratch = self._scratch
+        np.square(grad, out=scratch)
+        self._sum_sq += scratch
+        np.sqrt(self._sum_sq, out=scratch)
+        scratch += self.eps
+        np.divide(grad, scratch, out=scratch)
+        scratch *= lr
+        theta -= scratch
+
+
+class Adam(Optimizer):
+    """Adam: bias-corrected running means of the gradient and its square."""
+
+    def __init__(self, beta1: float = 0.9, beta2: float = 0.999, eps: float = 1e-8):
+        """
+        Args:
+            beta1: Decay of the running mean of the gradient.
+            beta2: Decay of the running mean of the squared gradient.
+            eps: Added to the root before dividing, for numerical stability.
+        """
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+
+    def reset(self, size: int) -> None:
+        """Allocate the scratch buffer and zero both running means."""
+        super().reset(size)
+        self._mean = np.zeros(size)
+        self._mean_sq = np.zeros(size)
+        self._t = 0
+
+    def step(self, theta: np.ndarray, grad: np.ndarray, lr: float) -> None:
+        """Update both running means and take a bias-corrected step in place."""
+        self._t += 1
+        scratch = self._scratch
+        self._mean *= self.beta1
+        np.multiply(grad, 1.0 - self.beta1, out=scratch)
+        self._mean += scratch
+        self._mean_sq *= self.beta2
+        np.square(grad, out=scratch)
+        scratch *= 1.0 - self.beta2
+        self._mean_sq += scratch
+        # scratch = lr * m_hat / (sqrt(v_hat) + eps)
+        np.divide(self._mean_sq, 1.0 - self.beta2 ** self._t, out=scratch)
+        np.sqrt(scratch, out=scratch)
+        scratch += self.eps
+        np.divide(self._mean, scratch, out=scratch)
+        scratch *= lr / (1.0 - self.beta1 ** self._t)
+        theta -= scratch
+
+
+_OPTIMIZERS = {
+    "sgd": SGD,
+    "momentum": Momentum,
+    "nesterov": Nesterov,
+    "adagrad": AdaGrad,
+    "adam": Adam,
+}
+
+
+class StepDecay:
+    """Multiply the learning rate by `drop` every `every` epochs."""
+
+    def __init__(self, drop: float = 0.5, every: int = 10):
+        """
+        Args:
+            drop: Factor applied at each drop.
+            every: Epochs between drops.
+        """
+        self.drop = drop
+        self.every = every
+
+    def __call__(self, epoch: int, base_lr: float) -> float:
+        """Return the learning rate for `epoch` (0-based)."""
+        return base_lr * self.drop ** (epoch // self.every)
+
+
+class ExponentialDecay:
+    """lr = base_lr * gamma ** epoch."""
+
+    def __init__(self, gamma: float = 0.95):
+        """
+        Args:
+            gamma: Factor applied per epoch.
+        """
+        self.gamma = gamma
+
+    def __call__(self, epoch: int, base_lr: float) -> float:
+        """Return the learning rate for `epoch` (0-based)."""
+        return base_lr * self.gamma ** epoch
+
+
+class InverseTimeDecay:
+    """lr = base_lr / (1 + decay * epoch)."""
+
+    def __init__(self, decay: float = 0.1):
+        """
+        Args:
+            decay: Growth of the denominator per epoch.
+        """
+        self.decay = decay
+
+    def __call__(self, epoch: int, base_lr: float) -> float:
+        """Return the learning rate for `epoch` (0-based)."""
+        return base_lr / (1.0 + self.decay * epoch)
+
+
+class CosineAnnealing:
+    """Cosine curve from base_lr down to min_lr over `total_epochs`."""
+
+    def __init__(self, total_epochs: int, min_lr: float = 0.0):
+        """
+        Args:
+            total_epochs: Epochs over which the rate falls to min_lr.
+            min_lr: Final learning rate, kept after total_epochs.
+        """
+        self.total_epochs = total_epochs
+        self.min_lr = min_lr
+
+    def __call__(self, epoch: int, base_lr: float) -> float:
+        """Return the learning rate for `epoch` (0-based)."""
+        progress = min(epoch / max(self.total_epochs - 1, 1), 1.0)
+        return self.min_lr + 0.5 * (base_lr - self.min_lr) * (1.0 + math.cos(math.pi * progress))
+
 
 class MiniBatchGD:
     """Mini-batch stochastic gradient descent for linear regression.
 
-    Fits a linear model y = X @ w + b by minimising MSE loss using
-    mini-batch gradient updates.
+    Fits a linear model y = X @ w + b by minimising MSE loss (plus optional
+    l1 * ||w||_1 + l2 * ||w||^2) using mini-batch gradient updates.
     """
 
     def __init__(self, learning_rate: float = 0.01, batch_size: int = 32,
-                 epochs: int = 100, seed: int = 42):
+                 epochs: int = 100, seed: int = 42,
+                 block_size: Optional[int] = None,
+                 full_eval_every: int = 1,
+                 optimizer: Union[str, Optimizer] = "sgd",
+                 lr_schedule: Optional[Callable[[int, float], float]] = None,
+                 l1: float = 0.0, l2: float = 0.0,
+                 early_stopping: bool = False,
+                 validation_fraction: float = 0.1,
+                 patience: int = 5, min_delta: float = 0.0,
+                 restore_best_weights: bool = True):
         """Initialise the optimiser.
 
         Args:
@@ -25,15 +264,105 @@ class MiniBatchGD:
             batch_size: Number of samples per mini-batch.
             epochs: Number of full passes over the training data.
             seed: Random seed for reproducibility.
+            block_size: Rows per shuffling block. None shuffles in-memory
+                arrays as a whole and np.memmap inputs in blocks of about
+                64 MiB; batches never span two blocks.
+            full_eval_every: Record an exact full-data loss every this many
+                epochs (and after the last one); other epochs record the
+                running batch loss. 0 never makes the extra pass.
+            optimizer: 'sgd', 'momentum', 'nesterov', 'adagrad', 'adam', or
+                an Optimizer instance for non-default hyperparameters.
+            lr_schedule: Callable (epoch, learning_rate) -> learning rate
+                for that epoch, e.g. StepDecay or CosineAnnealing; None
+                keeps the rate constant.
+            l1: L1 penalty on the weights (not the bias).
+            l2: L2 penalty on the weights (not the bias).
+            early_stopping: Hold out a random (seeded) validation_fraction
+                of the rows passed to fit unless validation_data is given,
+                and stop when the validation loss has not improved by
+                min_delta for `patience` epochs. fit_batches needs
+                validation_data for this.
+            validation_fraction: Share of rows held out for early stopping.
+            patience: Epochs without improvement before stopping.
+            min_delta: Minimum decrease that counts as an improvement.
+            restore_best_weights: With early_stopping, end with the weights
+                of the epoch that had the lowest validation loss. Without
+                early stopping, validation data is only monitored.
+
+        Raises:
+            ValueError: If the optimizer name is unknown.
         """
+        if isinstance(optimizer, str):
+            if optimizer not in _OPTIMIZERS:
+                raise ValueError(
+                    f"Unknown optimizer: {optimizer}. Use one of {', '.join(_OPTIMIZERS)}."
+                )
+            optimizer = _OPTIMIZERS[optimizer]()
         self.learning_rate = learning_rate
         self.batch_size = batch_size
         self.epochs = epochs
         self.seed = seed
+        self.block_size = block_size
+        self.full_eval_every = full_eval_every
+        self.optimizer = optimizer
+        self.lr_schedule = lr_schedule
+        self.l1 = l1
+        self.l2 = l2
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.min_delta = min_delta
+        self.restore_best_weights = restore_best_weights
+        self._val_loss_history = []
+        self.best_epoch_ = None
         self.w = None
         self.b = None
         self._loss_history = []
 
+    def _block_rows(self, X: np.ndarray) -> int:
+        """Rows per shuffling block, a multiple of batch_size."""
+        n = len(X)
+        if self.block_size is not None:
+            rows = self.block_size
+        elif isinstance(X, np.memmap):
+            rows = _BLOCK_BYTES // max(X[:1].nbytes, 1)
+        else:
+            return n
+        rows = max(self.batch_size, rows // self.batch_size * self.batch_size)
+        return min(rows, n)
+
+    def _iter_batches(self, X: np.ndarray,
+                      y: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield shuffled mini-batches one at a time.
+
+        Blocks of contiguous rows are visited in random order; each block
+        is read into memory once and its rows are permuted. With a single
+        block this is a plain permutation of all rows.
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features).
+            y: Target array of shape (n_samples,).
+
+        Yields:
+            (X_batch, y_batch) tuples.
+        """
+        n = len(y)
+        rows = self._block_rows(X)
+        starts = np.arange(0, n, rows)
+        if len(starts) > 1:
+            starts = starts[np.random.permutation(len(starts))]
+        for start in starts:
+            stop = min(start + rows, n)
+            if len(starts) == 1:
+                X_block, y_block = X, y
+            else:
+                X_block = np.array(X[start:stop])
+                y_block = np.array(y[start:stop])
+            order = np.random.permutation(stop - start)
+            for offset in range(0, stop - start, self.batch_size):
+                idx = order[offset:offset + self.batch_size]
+                yield X_block[idx], y_block[idx]
+
     def _create_batches(self, X: np.ndarray, y: np.ndarray) -> list:
         """Shuffle the data and split it into mini-batches.
 
@@ -44,13 +373,7 @@ class MiniBatchGD:
         Returns:
             A list of (X_batch, y_batch) tuples.
         """
-        n = len(y)
-        indices = np.random.permutation(n)
-        batches = []
-        for start in range(0, n, self.batch_size):
-            idx = indices[start:start + self.batch_size]
-            batches.append((X[idx], y[idx]))
-        return batches
+        return list(self._iter_batches(X, y))
 
     def _compute_gradients(self, X_batch: np.ndarray,
                            y_batch: np.ndarray) -> tuple:
@@ -64,16 +387,102 @@ class MiniBatchGD:
             A tuple (dw, db) where dw has shape (n_features,) and db is a
             scalar.
         """
-        m = len(y_batch)
-        predictions = X_batch @ self.w + self.b
-        error = predictions - y_batch
+        error = X_batch @ self.w + self.b - y_batch
+        return self._error_gradients(X_batch, error)
+
+    @staticmethod
+    def _error_gradients(X_batch: np.ndarray, error: np.ndarray) -> tuple:
+        """Gradients of the MSE loss given the batch residuals."""
+        m = len(error)
         dw = (2.0 / m) * (X_batch.T @ error)
         db = (2.0 / m) * np.sum(error)
         return dw, db
 
+    def _start(self, n_features: int) -> None:
+        """Allocate the parameters and every per-step buffer for one fit."""
+        size = n_features + 1
+        self._theta = np.zeros(size)
+        self.w = self._theta[:n_features]
+        self.b = 0.0
+        self._grad = np.empty(size)
+        self._penalty = np.empty(n_features)
+        self._error = np.empty(self.batch_size)
+        self._best_theta = np.empty(size)
+        self._best_val = math.inf
+        self._stale_epochs = 0
+        self.best_epoch_ = None
+        self.optimizer.reset(size)
+        self._loss_history = []
+        self._val_loss_history = []
+
+    def _batch_step(self, X_batch: np.ndarray, y_batch: np.ndarray,
+                    lr: Optional[float] = None) -> float:
+        """Apply one optimizer update, in place and without allocations.
+
+        Args:
+            X_batch: Feature matrix for this batch, shape (m, n_features).
+            y_batch: Target array for this batch, shape (m,).
+            lr: Learning rate for this step (defaults to learning_rate).
+
+        Returns:
+            The batch's sum of squared errors before the update.
+        """
+        m = len(y_batch)
+        d = len(self.w)
+        if m > len(self._error):
+            self._error = np.empty(m)
+        error = self._error[:m]
+        np.dot(X_batch, self.w, out=error)
+        error += self._theta[d]
+        error -= y_batch
+        grad = self._grad
+        np.dot(X_batch.T, error, out=grad[:d])
+        grad[:d] *= 2.0 / m
+        grad[d] = (2.0 / m) * np.sum(error)
+        if self.l2:
+            np.multiply(self.w, 2.0 * self.l2, out=self._penalty)
+            grad[:d] += self._penalty
+        if self.l1:
+            np.sign(self.w, out=self._penalty)
+            self._penalty *= self.l1
+            grad[:d] += self._penalty
+        self.optimizer.step(self._theta, grad, self.learning_rate if lr is None else lr)
+        self.b = float(self._theta[d])
+        return float(np.dot(error, error))
+
+    def _epoch_lr(self, epoch: int) -> float:
+        """Learning rate for `epoch`, from the schedule if one is set."""
+        if self.lr_schedule is None:
+            return self.learning_rate
+        return self.lr_schedule(epoch, self.learning_rate)
+
+    def _end_epoch(self, epoch: int, X_val: Optional[np.ndarray],
+                   y_val: Optional[np.ndarray]) -> bool:
+        """Track the validation loss; return True when training should stop."""
+        if X_val is None:
+            return False
+        loss = self._compute_loss(X_val, y_val)
+        self._val_loss_history.append(loss)
+        if loss < self._best_val - self.min_delta:
+            self._best_val = loss
+            self.best_epoch_ = epoch
+            np.copyto(self._best_theta, self._theta)
+            self._stale_epochs = 0
+        else:
+            self._stale_epochs += 1
+        return self.early_stopping and self._stale_epochs >= self.patience
+
+    def _finish(self) -> None:
+        """Restore the best validated weights if early stopping asked for it."""
+        if self.early_stopping and self.restore_best_weights and self.best_epoch_ is not None:
+            np.copyto(self._theta, self._best_theta)
+            self.b = float(self._theta[-1])
+
     def _compute_loss(self, X: np.ndarray, y: np.ndarray) -> float:
         """Compute the MSE loss over the given data.
 
+        Rows are read in bounded chunks, so X may be an np.memmap.
+
         Args:
             X: Feature matrix of shape (n_samples, n_features).
             y: Target array of shape (n_samples,).
@@ -81,34 +490,129 @@ class MiniBatchGD:
         Returns:
             The mean squared error as a float.
         """
-        predictions = X @ self.w + self.b
-        return float(np.mean((predictions - y) ** 2))
+        n = len(y)
+        rows = max(1, _BLOCK_BYTES // max(X[:1].nbytes, 1))
+        total = 0.0
+        for start in range(0, n, rows):
+            predictions = np.asarray(X[start:start + rows]) @ self.w + self.b
+            total += np.square(predictions - np.asarray(y[start:start + rows])).sum()
+        return float(total / n)
+
+    def _full_eval_due(self, epoch: int) -> bool:
+        """Whether `epoch` records an exact full-data loss instead of the running one."""
+        every = self.full_eval_every
+        return every > 0 and ((epoch + 1) % every == 0 or epoch + 1 == self.epochs)
 
-    def fit(self, X: np.ndarray, y: np.ndarray) -> 'MiniBatchGD':
+    def fit(self, X: np.ndarray, y: np.ndarray,
+            validation_data: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+            callback: Optional[Callable[[int, 'MiniBatchGD'], bool]] = None) -> 'MiniBatchGD':
         """Train the linear model using mini-batch gradient descent.
 
         Args:
             X: Training feature matrix of shape (n_samples, n_features).
             y: Training target array of shape (n_samples,).
+            validation_data: Optional (X_val, y_val) whose loss is tracked
+                each epoch, for early stopping and best-weight restore.
+            callback: Called as callback(epoch, self) after each epoch's
+                losses are recorded; returning True stops training, e.g.
+                once a target loss is reached.
 
         Returns:
             self, to allow method chaining.
         """
         np.random.seed(self.seed)
-        n_features = X.shape[1]
-        self.w = np.zeros(n_features)
-        self.b = 0.0
-        self._loss_history = []
+        X_val = y_val = None
+        if validation_data is not None:
+            X_val, y_val = validation_data
+        elif self.early_stopping:
+            n_val = max(1, int(round(len(y) * self.validation_fraction)))
+            # Sample the held-out rows so ordered data still validates on a
+            # representative set; training rows keep their input order.
+            order = np.random.permutation(len(y))
+            val, train = order[:n_val], np.sort(order[n_val:])
+            X, X_val = X[train], X[val]
+            y, y_val = y[train], y[val]
+        self._start(X.shape[1])
 
-        for _ in range(self.epochs):
-            batches = self._create_batches(X, y)
-            for X_batch, y_batch in batches:
-                dw, db = self._compute_gradients(X_batch, y_batch)
-                self.w -= self.learning_rate * dw
-                self.b -= self.learning_rate * db
-            loss = self._compute_loss(X, y)
-            self._loss_history.append(loss)
+        for epoch in range(self.epochs):
+            lr = self._epoch_lr(epoch)
+            sse = 0.0
+            for X_batch, y_batch in self._iter_batches(X, y):
+                sse += self._batch_step(X_batch, y_batch, lr)
+            if self._full_eval_due(epoch):
+                self._loss_history.append(self._compute_loss(X, y))
+            else:
+                self._loss_history.append(sse / len(y))
+            if self._end_epoch(epoch, X_val, y_val):
+                break
+            if callback is not None and callback(epoch, self):
+                break
 
+        self._finish()
+        return self
+
+    def fit_batches(self, batches: Union[Iterable, Callable[[], Iterable]],
+                    validation_data: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                    callback: Optional[Callable[[int, 'MiniBatchGD'], bool]] = None) -> 'MiniBatchGD':
+        """Train from a stream of mini-batches instead of arrays.
+
+        The source is read once per epoch (and once more for each full
+        evaluation), so it must be re-iterable: a list, an object whose
+        __iter__ starts over, or a zero-argument callable returning a fresh
+        iterable, e.g. a reader over files. Batches are used in the order
+        given; shuffle at the source.
+
+        Args:
+            batches: Source of (X_batch, y_batch) tuples.
+            validation_data: Optional (X_val, y_val) for early stopping and
+                best-weight restore.
+            callback: Called as callback(epoch, self) after each epoch;
+                returning True stops training.
+
+        Returns:
+            self, to allow method chaining.
+
+        Raises:
+            ValueError: If early_stopping is on without validation_data, or
+                if an epoch or a full evaluation pass sees no samples or a
+                different number of samples than training did, as with a
+                one-shot generator.
+        """
+        if self.early_stopping and validation_data is None:
+            raise ValueError("early_stopping with fit_batches requires validation_data")
+        epoch_batches = batches if callable(batches) else (lambda: batches)
+        X_val, y_val = validation_data if validation_data is not None else (None, None)
+        self.w = None
+
+        for epoch in range(self.epochs):
+            lr = self._epoch_lr(epoch)
+            sse, seen = 0.0, 0
+            for X_batch, y_batch in epoch_batches():
+                X_batch, y_batch = np.asarray(X_batch), np.asarray(y_batch)
+                if self.w is None:
+                    self._start(X_batch.shape[1])
+                sse += self._batch_step(X_batch, y_batch, lr)
+                seen += len(y_batch)
+            if not seen:
+                raise ValueError("batch source produced no samples")
+            if self._full_eval_due(epoch):
+                sse, evaluated = 0.0, 0
+                for X_b, y_b in epoch_batches():
+                    y_b = np.asarray(y_b)
+                    sse += float(np.square(np.asarray(X_b) @ self.w + self.b - y_b).sum())
+                    evaluated += len(y_b)
+                if evaluated != seen:
+                    raise ValueError(
+                        f"batch source yielded {evaluated} samples on re-iteration, expected "
+                        f"{seen}; pass a list or a callable returning a fresh iterable"
+                    )
+            self._loss_history.append(sse / seen)
+            if self._end_epoch(epoch, X_val, y_val):
+                break
+            if callback is not None and callback(epoch, self):
+                break
+
+        self._finish()
         return self
 
     def predict(self, X: np.ndarray) -> np.ndarray:
@@ -126,3 +630,98 @@ class MiniBatchGD:
     def loss_history(self) -> list:
         """Return the list of MSE losses recorded at the end of each epoch."""
         return self._loss_history
+
+    @property
+    def val_loss_history(self) -> list:
+        """Return the validation MSE after each epoch (empty without validation data)."""
+        return self._val_loss_history
+
+
+def benchmark_out_of_core(n_samples: int = 1_000_000, n_features: int = 16,
+                          epochs: int = 2) -> None:
+    """Train on an np.memmap file and compare time and peak traced memory
+    with the in-memory fit.
+
+    Args:
+        n_samples: Rows in the generated dataset.
+        n_features: Columns in the generated dataset.
+        epochs: Training epochs per run.
+    """
+    rng = np.random.default_rng(0)
+    w_true = rng.standard_normal(n_features)
+    with tempfile.TemporaryDirectory() as tmp:
+        X = np.lib.format.open_memmap(os.path.join(tmp, "X.npy"), "w+", np.float64,
+                                      (n_samples, n_features))
+        y = np.lib.format.open_memmap(os.path.join(tmp, "y.npy"), "w+", np.float64,
+                                      (n_samples,))
+        for start in range(0, n_samples, 1 << 16):
+            rows = X[start:start + (1 << 16)]
+            rows[...] = rng.standard_normal(rows.shape)
+            y[start:start + len(rows)] = rows @ w_true + 0.1 * rng.standard_normal(len(rows))
+        X.flush()
+        y.flush()
+        del X, y
+        X = np.load(os.path.join(tmp, "X.npy"), mmap_mode="r")
+        y = np.load(os.path.join(tmp, "y.npy"), mmap_mode="r")
+
+        print(f"{n_samples} x {n_features} float64 ({X.nbytes / 2**20:.0f} MiB), "
+              f"{epochs} epochs, batch 256")
+        runs = [
+            ("in-memory arrays", lambda: MiniBatchGD(0.01, 256, epochs).fit(np.array(X), np.array(y))),
+            ("memmap, full eval", lambda: MiniBatchGD(0.01, 256, epochs).fit(X, y)),
+            ("memmap, running loss", lambda: MiniBatchGD(0.01, 256, epochs, full_eval_every=0).fit(X, y)),
+        ]
+        for name, train in runs:
+            tracemalloc.start()
+            start = time.perf_counter()
+            model = train()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {name:<21} {elapsed:6.2f} s  peak {peak / 2**20:7.1f} MiB  "
+                  f"loss {model.loss_history[-1]:.5f}")
+
+
+def benchmark_optimizers(n_samples: int = 20_000, n_features: int = 20,
+                         target: float = 0.011, max_epochs: int = 200) -> None:
+    """Compare epochs and wall time to reach a target training loss on
+    ill-conditioned data (feature scales spanning two orders of magnitude).
+
+    Args:
+        n_samples: Rows in the generated dataset.
+        n_features: Columns in the generated dataset.
+        target: Training MSE to reach (the noise floor is 0.01).
+        max_epochs: Epoch cap per run.
+    """
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_samples, n_features)) * np.logspace(-1, 1, n_features)
+    y = X @ rng.standard_normal(n_features) + 3.0 + 0.1 * rng.standard_normal(n_samples)
+    runs = [
+        ("sgd", 0.004, None),
+        ("sgd + cosine", 0.004, CosineAnnealing(max_epochs)),
+        ("momentum", 0.0004, None),
+        ("nesterov", 0.0004, None),
+        ("adagrad", 0.5, None),
+        ("adam", 0.05, None),
+        ("adam + exp decay", 0.05, ExponentialDecay(0.95)),
+    ]
+    print(f"{n_samples} x {n_features}, batch 64, target loss {target}")
+
+    def reached_target(epoch: int, model: MiniBatchGD) -> bool:
+        return float(np.mean(np.square(model.predict(X) - y))) <= target
+
+    for name, lr, schedule in runs:
+        model = MiniBatchGD(lr, 64, max_epochs, optimizer=name.split()[0], lr_schedule=schedule,
+                            full_eval_every=0)
+        start = time.perf_counter()
+        model.fit(X, y, callback=reached_target)
+        elapsed = time.perf_counter() - start
+        epochs = len(model.loss_history)
+        loss = float(np.mean(np.square(model.predict(X) - y)))
+        result = f"{epochs:4d} epochs" if loss <= target else f"  >{max_epochs} epochs"
+        print(f"  {name:<17} lr {lr:<7} {result}  {elapsed:6.2f} s  loss {loss:.5f}")
+
+
+if __name__ == "__main__":
+    benchmark_out_of_core()
+    benchmark_optimizers()
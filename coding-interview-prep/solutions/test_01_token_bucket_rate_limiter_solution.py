@@ -0,0 +1,45 @@
+"""Regression tests for the Token Bucket Rate Limiter solution's quota leases."""
+
+import importlib.util
+import os
+import threading
+import unittest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+_spec = importlib.util.spec_from_file_location(
+    "token_bucket_rate_limiter_solution",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "01_token_bucket_rate_limiter_solution.py"),
+)
+solution = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(solution)
+
+
+class TestQuotaCoordinatorAuthentication(unittest.TestCase):
+    """A client with the wrong authkey must not take the coordinator down."""
+
+    def test_bad_authkey_client_does_not_stop_serving(self):
+        """After a rejected client, a client with the right key still gets a lease."""
+        coordinator = solution.QuotaCoordinator(10, 10.0, authkey=b"secret")
+        coordinator.start()
+        self.addCleanup(coordinator.close)
+
+        with self.assertRaises(AuthenticationError):
+            Client(coordinator.address, authkey=b"wrong")
+
+        result = []
+
+        def good_client():
+            bucket = solution.LeasedTokenBucket(coordinator.address, b"secret", block_size=5)
+            result.append(bucket.allow_request())
+            bucket.close()
+
+        worker = threading.Thread(target=good_client, daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive(), "valid client hung after a bad-authkey client")
+        self.assertEqual(result, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+"""Regression tests for the Bloom Filter solution's scalable filter."""
+
+import importlib.util
+import os
+import unittest
+
+_spec = importlib.util.spec_from_file_location(
+    "bloom_filter_solution",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "02_bloom_filter_solution.py"),
+)
+solution = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(solution)
+
+
+class TestScalableBloomFilterAddMany(unittest.TestCase):
+    """add_many must count items the way repeated add() calls do."""
+
+    def test_batch_duplicates_counted_once(self):
+        """Repeats within one batch use up capacity only once."""
+        batched = solution.ScalableBloomFilter(initial_capacity=100)
+        batched.add_many(["a", "a", "b", b"b"])
+        single = solution.ScalableBloomFilter(initial_capacity=100)
+        for item in ["a", "a", "b", b"b"]:
+            single.add(item)
+        self.assertEqual(batched.count, 2)
+        self.assertEqual(batched.count, single.count)
+        self.assertIn("a", batched)
+        self.assertIn("b", batched)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Regression tests for the LRU Cache solution's loading caches."""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import unittest
+
+_spec = importlib.util.spec_from_file_location(
+    "lru_cache_solution",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "03_lru_cache_solution.py"),
+)
+solution = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(solution)
+
+
+class TestLoadingCacheAbortedLoads(unittest.TestCase):
+    """A loader that raises a BaseException must not wedge its key."""
+
+    def test_base_exception_releases_key(self):
+        """After a loader raises SystemExit, the next load for the key runs."""
+        cache = solution.LoadingCache(capacity=4)
+
+        def exiting_loader(key):
+            raise SystemExit(1)
+
+        with self.assertRaises(SystemExit):
+            cache.get_or_load("k", exiting_loader)
+        self.assertNotIn("k", cache._inflight)
+
+        result = []
+        worker = threading.Thread(target=lambda: result.append(cache.get_or_load("k", str.upper)))
+        worker.start()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive(), "get_or_load hung after an aborted load")
+        self.assertEqual(result, ["K"])
+
+    def test_waiters_released_on_base_exception(self):
+        """Threads waiting on an aborted load are woken with its exception."""
+        cache = solution.LoadingCache(capacity=4)
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def interrupted_loader(key):
+            started.set()
+            release.wait()
+            raise KeyboardInterrupt
+
+        def owner():
+            try:
+                cache.get_or_load("k", interrupted_loader)
+            except KeyboardInterrupt as exc:
+                errors.append(exc)
+
+        def waiter():
+            try:
+                cache.get_or_load("k", str.upper)
+            except KeyboardInterrupt as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=owner)]
+        threads[0].start()
+        self.assertTrue(started.wait(timeout=5))
+        # Only release the load once the waiter is blocked on the flight.
+        waiting = threading.Event()
+        flight = cache._inflight["k"]
+
+        class SignallingEvent(threading.Event):
+            def wait(self, timeout=None):
+                waiting.set()
+                return super().wait(timeout)
+
+        flight.event = SignallingEvent()
+        threads.append(threading.Thread(target=waiter))
+        threads[1].start()
+        self.assertTrue(waiting.wait(timeout=5), "waiter never blocked on the in-flight load")
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertFalse(any(t.is_alive() for t in threads))
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(cache.get_or_load("k", str.upper), "K")
+
+    def test_async_cancelled_load_not_kept(self):
+        """A loader that raises CancelledError does not poison later calls."""
+        cache = solution.AsyncLoadingCache(capacity=4)
+
+        async def cancelled_loader(key):
+            raise asyncio.CancelledError
+
+        async def loader(key):
+            return key.upper()
+
+        async def scenario():
+            with self.assertRaises(asyncio.CancelledError):
+                await cache.get_or_load("k", cancelled_loader)
+            self.assertNotIn("k", cache._inflight)
+            return await cache.get_or_load("k", loader)
+
+        self.assertEqual(asyncio.run(scenario()), "K")
+
+
+class TestConcurrentLRUCacheSegments(unittest.TestCase):
+    """Small caches must not get segments that can hold nothing."""
+
+    def test_capacity_below_segment_count(self):
+        """A cache smaller than num_segments still holds capacity items."""
+        cache = solution.ConcurrentLRUCache(capacity=4, num_segments=16)
+        self.assertEqual(cache.num_segments, 4)
+        for key in range(4):
+            cache.put(key, str(key))
+        self.assertEqual([cache.get(key) for key in range(4)], ["0", "1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()